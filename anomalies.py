@@ -0,0 +1,152 @@
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from growth import period_index, PERIODS_PER_YEAR, QOQ_LAG, YOY_MONTHLY_LAG
+from rolling import dense_series
+from schema import apply_schema
+
+# Every observed value is scored against the trailing window of its own Maker/vehicle_type series:
+# robust z = (x - median) / (1.4826 * MAD), on log scale (log1p registrations, log ratio for growth)
+# because registrations grow and fall multiplicatively. Median and MAD are not dragged by the spikes
+# they are meant to find, as a mean/std z-score would be.
+ANOMALIES_SUFFIX = '_anomalies.xlsx'
+WINDOWS = {'month': 12, 'quarter': 8}  # trailing periods each value is compared with
+MIN_HISTORY = 6  # non-missing values the window needs before a value is scored
+Z_THRESHOLD = 3.5  # |robust z| at or above this is flagged
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed data
+# Floor on the log-scale spread (1.4826 * MAD). Values after a near-constant or mostly-zero history are
+# still scored, against this floor instead of their near-zero MAD, so they flag only on a move of at least
+# Z_THRESHOLD * MIN_SCALE log units (about 5.8x) rather than on noise
+MIN_SCALE = 0.5
+MIN_REGISTRATIONS = 10  # values whose registrations (and baseline / prior period) are all below this are skipped
+CHUNK_SERIES = 4096  # series scored at a time; bounds the (series x periods x window) arrays
+
+# Columns of the anomalies table after the view and series keys
+ANOMALY_COLS = ['year', 'period', 'date', 'metric', 'value', 'baseline', 'robust_z', 'direction']
+
+# (view, period column, growth column scanned alongside registrations, its lag)
+VIEWS = [('Monthly', 'month', 'YoY_growth_%', YOY_MONTHLY_LAG), ('Quarterly', 'quarter', 'QoQ_growth_%', QOQ_LAG)]
+
+
+def anomalies_path(path):
+    """Anomalies table path for a monthly metrics path (same folder and name, _anomalies suffix)"""
+    return os.path.splitext(path)[0] + ANOMALIES_SUFFIX
+
+
+def nan_median(values, counts=None):
+    """Median over the last axis ignoring NaN; NaN where there are no values
+
+    counts, the non-NaN values along that axis, is computed unless given.
+    """
+    if counts is None:
+        counts = np.count_nonzero(~np.isnan(values), axis=-1)
+    ordered = np.sort(values, axis=-1)  # NaN sorts last
+    low = np.take_along_axis(ordered, np.maximum((counts - 1) // 2, 0)[..., None], axis=-1)[..., 0]
+    high = np.take_along_axis(ordered, (counts // 2)[..., None], axis=-1)[..., 0]
+    return np.where(counts > 0, (low + high) / 2, np.nan)
+
+
+def _robust_scores(values, window, min_history, min_scale):
+    # Cell t of each row sees the cells t - window .. t - 1 of the same row
+    history = np.concatenate([np.full((len(values), window), np.nan), values[:, :-1]], axis=1)
+    windows = sliding_window_view(history, window, axis=1)
+    # Values per window from a running count, instead of counting inside every window
+    cumulative = np.zeros((len(values), history.shape[1] + 1), dtype='int64')
+    np.cumsum(~np.isnan(history), axis=1, out=cumulative[:, 1:])
+    counts = cumulative[:, window:] - cumulative[:, :-window]
+    median = nan_median(windows, counts)
+    scale = np.maximum(MAD_SCALE * nan_median(np.abs(windows - median[..., None]), counts), min_scale)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (values - median) / scale
+    return median, np.where(counts >= min_history, z, np.nan)
+
+
+def robust_scores(values, window, min_history=MIN_HISTORY, min_scale=MIN_SCALE, chunk_series=CHUNK_SERIES):
+    """(trailing median, robust z) of every cell of a (series x period) array against the window before it
+
+    NaN cells are missing history; cells with fewer than min_history values before them get a NaN z.
+    The spread is floored at min_scale, so a near-constant window still scores the cell after it.
+    """
+    median = np.full(values.shape, np.nan)
+    z = np.full(values.shape, np.nan)
+    for start in range(0, len(values), chunk_series):
+        rows = slice(start, start + chunk_series)
+        median[rows], z[rows] = _robust_scores(values[rows], window, min_history, min_scale)
+    return median, z
+
+
+def scan_view(df, view, period_col, growth_col, lag, threshold=Z_THRESHOLD, window=None):
+    """Flagged registrations and growth values of one metrics frame (monthly or quarterly)
+
+    Growth is recomputed from the dense registrations with its sign kept (the metrics columns hold
+    absolute values), so a collapse shows up as a drop rather than as a spike.
+    """
+    group_cols = ['vehicle_type', 'Maker']
+    if 'vehicle_category' in df.columns:
+        group_cols.insert(1, 'vehicle_category')
+    df = df[df[group_cols].notnull().all(axis=1).to_numpy()].reset_index(drop=True)
+    if df.empty:
+        return pd.DataFrame(columns=['view'] + group_cols + ANOMALY_COLS)
+    values, group_ids, offsets, starts = dense_series(df, group_cols, period_col=period_col)
+    periods = np.arange(values.shape[1])
+    # Periods with no registrations in any series (months of the current year not reported yet) are skipped
+    reported = values.sum(axis=0) > 0
+    observed = np.zeros(values.shape, dtype=bool)
+    observed[group_ids, offsets] = True
+    observed &= reported
+
+    # Periods without a row inside a series had no registrations; before its first row it did not exist yet
+    registrations = np.where((periods[None, :] >= starts[:, None]) & reported, values, np.nan)
+    prev = np.full(values.shape, np.nan)
+    prev[:, lag:] = values[:, :-lag]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(observed & (prev > 0), (values - prev) / prev * 100, np.nan)
+        log_ratio = np.where(observed & (prev > 0), np.log1p(values) - np.log1p(prev), np.nan)
+
+    window = window or WINDOWS[period_col]
+    registrations_median, registrations_z = robust_scores(np.log1p(registrations), window)
+    growth_median, growth_z = robust_scores(log_ratio, window)
+    # (metric, reported values, robust z, trailing median in the metric's units, registrations behind each value)
+    metrics = [
+        ('registrations', registrations, registrations_z, np.expm1(registrations_median),
+         np.fmax(registrations, np.expm1(registrations_median))),
+        (growth_col, growth, growth_z, np.expm1(growth_median) * 100, np.fmax(values, prev)),
+    ]
+    period_ids = period_index(df, period_col).min() + offsets
+    frames = []
+    for metric, reported, z, baseline, volume in metrics:
+        cells = (group_ids, offsets)
+        flagged = np.flatnonzero((np.abs(z[cells]) >= threshold) & (volume[cells] >= MIN_REGISTRATIONS))
+        cells = (group_ids[flagged], offsets[flagged])
+        years, numbers = np.divmod(period_ids[flagged], PERIODS_PER_YEAR[period_col])
+        numbers += 1
+        out = df[group_cols].iloc[flagged].reset_index(drop=True)
+        out.insert(0, 'view', view)
+        out['year'] = years
+        out['period'] = numbers
+        # Start of the month or quarter, for date range filters
+        out['date'] = pd.to_datetime(pd.DataFrame({
+            'year': years, 'month': numbers if period_col == 'month' else (numbers - 1) * 3 + 1, 'day': 1}))
+        out['metric'] = metric
+        out['value'] = np.round(reported[cells], 2)
+        out['baseline'] = np.round(baseline[cells], 2)
+        out['robust_z'] = np.round(z[cells], 2)
+        out['direction'] = np.where(z[cells] > 0, 'spike', 'drop')
+        frames.append(out)
+    return pd.concat(frames, ignore_index=True)
+
+
+def scan_anomalies(df_month, df_quarter, threshold=Z_THRESHOLD):
+    """Anomalies table over every Maker/vehicle_type series of both views, strongest first
+
+    One row per flagged value: view, series keys, year, period (month or quarter number), date,
+    metric, value, baseline (trailing median), robust_z and direction ('spike' or 'drop').
+    """
+    frames = [scan_view(df, view, period_col, growth_col, lag, threshold)
+              for df, (view, period_col, growth_col, lag) in zip([df_month, df_quarter], VIEWS)]
+    out = pd.concat(frames, ignore_index=True)
+    order = np.argsort(-out['robust_z'].abs().to_numpy(), kind='stable')
+    return apply_schema(out.iloc[order].reset_index(drop=True))
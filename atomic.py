@@ -0,0 +1,37 @@
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Atomic writes for every file readers may open while it is rebuilt: the Parquet store, Excel exports,
+# the SQLite store, the manifest, schema cache, summary and snapshot pointers. Stdlib only, so the
+# dashboard can import it before pandas.
+
+
+@contextmanager
+def replacing(path):
+    """Yield a temporary path next to `path`; once the block finishes, it replaces `path`
+
+    The temporary file is uniquely named in the same folder, so a reader sees the old or the new
+    file, never a half-written one, concurrent writers never share it, and it is removed when the
+    block fails.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        yield tmp_path
+        # mkstemp files are owner-only; the dashboard may run as another user
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_json(path, data, indent=2):
+    """Write `data` as JSON to `path` atomically (see replacing)"""
+    with replacing(path) as tmp_path:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=indent)
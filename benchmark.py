@@ -0,0 +1,221 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from calculation import (CHUNK_ROWS, add_growth_metrics, compute_growth, finalize_results, iter_wide_months, month_map,
+                         wide_months)
+from clean import clean
+from combine import combine, raw_files
+from filter_index import build_monthly_index
+from growth import add_lag_growth, QOQ_LAG, YOY_MONTHLY_LAG
+from storage import iter_frames, save_frame
+from streaming import stream_aggregates
+
+MONTHS = ["JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"]
+
+# Preset dataset sizes: makers per raw file, years, vehicle types
+SIZES = {
+    'small': {'makers': 100, 'years': 2, 'vehicle_types': 2},
+    'medium': {'makers': 500, 'years': 3, 'vehicle_types': 3},
+    'large': {'makers': 2000, 'years': 5, 'vehicle_types': 3},
+}
+VEHICLE_TYPES = ['2W', '3W', '4W']
+FIRST_YEAR = 2020
+
+
+# ===== SYNTHETIC DATA =====
+def maker_names(n):
+    return [f"SYNTHETIC MAKER {i:05d} PVT LTD" for i in range(n)]
+
+
+def monthly_counts(rng, n_rows):
+    """Registrations per maker and month: a heavy-tailed base size with monthly noise"""
+    base = rng.lognormal(mean=3, sigma=1.5, size=(n_rows, 1))
+    return rng.poisson(base * rng.uniform(0.5, 1.5, size=(n_rows, 12))).astype('int64')
+
+
+def write_raw_workbook(path, year, makers, rng):
+    """Write one raw workbook laid out like the files in `raw data/` (title, two header rows, maker rows)"""
+    counts = monthly_counts(rng, len(makers))
+    title = f"Maker Month Wise Data  For All State ({year})"
+    rows = [
+        [title] + [None] * 14,
+        ["S No", "Maker", "Month Wise"] + [None] * 11 + ["TOTAL"],
+        [None] * 15,
+        [None, None] + MONTHS + [None],
+    ]
+    for i, (maker, row) in enumerate(zip(makers, counts), start=1):
+        rows.append([i, maker] + row.tolist() + [int(row.sum())])
+    pd.DataFrame(rows).to_excel(path, header=False, index=False)
+
+
+def make_raw_folder(folder, makers, years, vehicle_types, seed=0):
+    """Synthetic `raw data/` folder: one workbook per vehicle type and year"""
+    rng = np.random.default_rng(seed)
+    names = maker_names(makers)
+    os.makedirs(folder, exist_ok=True)
+    for vehicle_type in VEHICLE_TYPES[:vehicle_types]:
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            write_raw_workbook(os.path.join(folder, f"{vehicle_type.lower()}_{year}.xlsx"), year, names, rng)
+    return folder
+
+
+def make_monthly_summary(cleaned):
+    """Monthly registrations per vehicle_type/Maker, as calculation.py aggregates them"""
+    long = cleaned.melt(id_vars=['Maker', 'vehicle_type', 'year'], value_vars=MONTHS,
+                        var_name='month_name', value_name='registrations')
+    long['month'] = long['month_name'].map({m: i for i, m in enumerate(MONTHS, start=1)})
+    long['date'] = pd.to_datetime(dict(year=long['year'], month=long['month'], day=1))
+    long['quarter'] = (long['month'] - 1) // 3 + 1
+    return long.drop(columns='month_name')
+
+
+# ===== MEASUREMENT =====
+def measure(func, memory=True):
+    """Run func once for wall time, and once more under tracemalloc for peak Python memory"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        peak_mb = None
+        if memory:
+            tracemalloc.start()
+            func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+            tracemalloc.stop()
+    return result, seconds, peak_mb
+
+
+def stream_growth(path, chunk_rows):
+    """calculation.py's STREAMING path: fold the stored cleaned frame chunk by chunk, then add growth"""
+    monthly_summary, quarterly_summary = stream_aggregates(iter_wide_months(iter_frames(path, chunk_rows)), month_map)
+    final_results, quarterly_with_qoq = add_growth_metrics(monthly_summary, quarterly_summary)
+    return finalize_results(final_results), quarterly_with_qoq
+
+
+def bench_size(label, makers, years, vehicle_types, memory=True):
+    """Time and memory-profile every stage for one dataset size"""
+    results = []
+
+    def record(stage, rows_in, func):
+        result, seconds, peak_mb = measure(func, memory=memory)
+        results.append({'size': label, 'stage': stage, 'makers': makers, 'years': years,
+                        'vehicle_types': vehicle_types, 'rows_in': int(rows_in),
+                        'seconds': round(seconds, 4), 'peak_mb': None if peak_mb is None else round(peak_mb, 2)})
+        print(f"  {stage:<24} rows_in={rows_in:>9,}  {seconds:8.3f}s  "
+              + ("" if peak_mb is None else f"peak {peak_mb:8.1f} MB"))
+        return result
+
+    with tempfile.TemporaryDirectory() as work:
+        raw_folder = make_raw_folder(os.path.join(work, 'raw data'), makers, years, vehicle_types)
+        raw_rows = (makers + 4) * years * vehicle_types
+
+        # The stage functions chain in memory, as pipeline.py runs them
+        combined = record('combine', raw_rows, lambda: combine(raw_files(raw_folder)))
+        cleaned = record('clean', len(combined), lambda: clean(combined))
+        record('calculation', len(cleaned), lambda: compute_growth(cleaned))
+
+        # Streaming reads clean()'s stored output in chunks, as calculation.py's STREAMING mode does
+        store = os.path.join(work, 'vehicle_registrations_cleaned.xlsx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            save_frame(cleaned, store)
+        record('calculation (streaming)', len(cleaned), lambda: stream_growth(store, CHUNK_ROWS))
+
+        cleaned_frame = wide_months(cleaned)
+        monthly = make_monthly_summary(cleaned_frame)
+        quarterly = monthly.groupby(['vehicle_type', 'Maker', 'year', 'quarter'], as_index=False, observed=True)['registrations'].sum()
+        record('growth YoY', len(monthly), lambda: add_lag_growth(
+            monthly, 'month', YOY_MONTHLY_LAG, prev_col='registrations_last_year', growth_col='YoY_growth_%'))
+        record('growth QoQ', len(quarterly), lambda: add_lag_growth(
+            quarterly, 'quarter', QOQ_LAG, prev_col='registrations_last_quarter', growth_col='QoQ_growth_%'))
+
+        with_growth = add_lag_growth(monthly, 'month', YOY_MONTHLY_LAG, label='YoY')
+        with_growth['QoQ_growth_%'] = with_growth['YoY_growth_%'].sample(frac=1, random_state=0).to_numpy()
+        record('dashboard index build', len(with_growth), lambda: build_monthly_index(with_growth))
+        index = build_monthly_index(with_growth)
+        half_makers = index.makers[::2]
+
+        def dashboard_query():
+            vt_mask, maker_mask = index.masks(index.vehicle_types, half_makers)
+            first, last = index.period_range(index.period_ranges[0], index.period_ranges[-1])
+            return (index.filtered_rows(vt_mask, maker_mask, first, last),
+                    index.totals(vt_mask, maker_mask, first, last),
+                    index.trend(vt_mask, maker_mask, first, last),
+                    index.by_maker(vt_mask, maker_mask, first, last))
+        record('dashboard filter query', len(with_growth), dashboard_query)
+    return results
+
+
+# ===== REPORT =====
+def compare_reports(old, new, threshold=1.2):
+    """Print per-stage time and memory ratios against an earlier report; returns regressed entries"""
+    old_entries = {(e['size'], e['stage']): e for e in old['results']}
+    regressions = []
+    print(f"\n{'size':<8} {'stage':<24} {'time x':>8} {'memory x':>9}")
+    for entry in new['results']:
+        before = old_entries.get((entry['size'], entry['stage']))
+        if before is None:
+            continue
+        time_ratio = entry['seconds'] / before['seconds'] if before['seconds'] else float('nan')
+        mem_ratio = (entry['peak_mb'] / before['peak_mb']
+                     if entry['peak_mb'] is not None and before.get('peak_mb') else float('nan'))
+        flag = " ⚠️" if time_ratio > threshold or mem_ratio > threshold else ""
+        print(f"{entry['size']:<8} {entry['stage']:<24} {time_ratio:8.2f} {mem_ratio:9.2f}{flag}")
+        if flag:
+            regressions.append(entry)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic registration data")
+    parser.add_argument('--sizes', default='small,medium', help=f"comma-separated presets from {', '.join(SIZES)}")
+    parser.add_argument('--makers', type=int, help="custom size: makers per raw file")
+    parser.add_argument('--years', type=int, default=3, help="custom size: number of years")
+    parser.add_argument('--vehicle-types', type=int, default=3, help="custom size: number of vehicle types (1-3)")
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    parser.add_argument('--out', default='benchmark_report.json', help="machine-readable report path")
+    parser.add_argument('--compare', help="earlier report to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="ratio above which a stage counts as regressed")
+    args = parser.parse_args(argv)
+
+    sizes = {name: SIZES[name] for name in args.sizes.split(',') if name}
+    if args.makers:
+        sizes = {f"custom-{args.makers}x{args.years}x{args.vehicle_types}":
+                 {'makers': args.makers, 'years': args.years, 'vehicle_types': args.vehicle_types}}
+
+    results = []
+    for label, size in sizes.items():
+        print(f"📏 {label}: {size}")
+        results.extend(bench_size(label, memory=not args.no_memory, **size))
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'results': results,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Report saved to: {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare_reports(json.load(f), report, args.threshold)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,33 @@
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 from datetime import datetime
 
+import profiling
+from anomalies import anomalies_path, scan_anomalies
+from excel_export import export_workbooks, flat_frame, split_workbooks
+from growth import add_lag_growth, join_period_values, quarter_of_month, QOQ_LAG, YOY_MONTHLY_LAG
+from incremental import (affected_periods, load_manifest, manifest_path, mark_done, pending_partitions,
+                         save_manifest, source_mask, splice_periods)
+from rolling import add_rolling_metrics
+from storage import data_version, iter_frames, load_frame, parquet_path, save_frame
+from schema import apply_schema, compact, year_quarter
+from streaming import stream_aggregates
+from summary import build_summary, save_summary, summary_path
+
 # ===== CONFIG =====
 INPUT_FILE = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_registrations_cleaned.xlsx"
 OUTPUT_FILE = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_growth_metrics.xlsx"
-
-# ===== 1. LOAD CLEANED FILE =====
-df = pd.read_excel(INPUT_FILE)
-print("✅ Loaded:", df.shape)
-print("Columns:", df.columns.tolist())
+EXPORT_EXCEL = False  # also write the metrics and insights workbooks (the dashboard reads the Parquet store)
+EXPORT_SPLIT_BY_VEHICLE_TYPE = False  # write one monthly/quarterly workbook per vehicle_type instead of one each
+EXPORT_WORKERS = 1  # >1 writes workbooks in that many worker processes (the largest workbook still bounds the time)
+ANOMALY_SCAN = True  # flag outlier registrations/growth per Maker and vehicle_type for the dashboard (see anomalies.py)
+INCREMENTAL = True  # recompute only the periods affected by partitions clean.py marked as changed
+STREAMING = False  # aggregate the cleaned input in chunks instead of melting it whole (bounded memory)
+CHUNK_ROWS = 50_000  # wide rows per chunk in streaming mode
+PROFILE = None  # "trace": per-stage JSON trace with peak memory next to the output; "cprofile": also a cProfile dump
 
 # ===== 2. DEFINE MONTH MAP =====
 month_map = {
@@ -17,274 +35,420 @@ month_map = {
     "JUL": 7, "AUG": 8, "SEP": 9, "OCT": 10, "NOV": 11, "DEC": 12
 }
 
-# ===== 3. MELT WIDE TO LONG FORMAT =====
-month_cols = [col for col in df.columns if col.upper() in month_map.keys()]
-id_vars = [col for col in df.columns if col not in month_cols]
-
-print("Month columns found:", month_cols)
-print("ID variables:", id_vars)
-
-df_long = df.melt(
-    id_vars=id_vars, 
-    value_vars=month_cols,
-    var_name='month_name', 
-    value_name='registrations'
-)
-
-# Clean and prepare data
-df_long['month'] = df_long['month_name'].str.upper().map(month_map)
-df_long['registrations'] = pd.to_numeric(df_long['registrations'], errors='coerce').fillna(0)
-
-# Remove rows with invalid years
-df_long = df_long[df_long['year'].notnull()]
-df_long['year'] = df_long['year'].astype(int)
-
-# Create proper date column
-df_long['date'] = pd.to_datetime(
-    df_long['year'].astype(str) + '-' + 
-    df_long['month'].astype(str) + '-01',
-    errors='coerce'
-)
-
-# Remove invalid dates
-df_long = df_long.dropna(subset=['date'])
-
-# Add quarter information
-df_long['quarter'] = df_long['date'].dt.quarter
-df_long['year_quarter'] = df_long['year'].astype(str) + '-Q' + df_long['quarter'].astype(str)
-
-print("✅ Data transformation complete. Shape:", df_long.shape)
-
-# ===== 4. MONTHLY AGGREGATION =====
-# Group by relevant columns for monthly data
-group_cols_monthly = ['vehicle_type', 'Maker', 'date', 'year', 'month']
-if 'vehicle_category' in df_long.columns:
-    group_cols_monthly.insert(1, 'vehicle_category')
-
-monthly_summary = df_long.groupby(group_cols_monthly)['registrations'].sum().reset_index()
-
-# ===== 5. QUARTERLY AGGREGATION =====
-group_cols_quarterly = ['vehicle_type', 'Maker', 'year', 'quarter', 'year_quarter']
-if 'vehicle_category' in df_long.columns:
-    group_cols_quarterly.insert(1, 'vehicle_category')
-
-quarterly_summary = df_long.groupby(group_cols_quarterly)['registrations'].sum().reset_index()
-
-print("✅ Monthly aggregation complete. Shape:", monthly_summary.shape)
-print("✅ Quarterly aggregation complete. Shape:", quarterly_summary.shape)
+# ===== 2b. ALIGN CLEANED LAYOUT =====
+def report_counts(frame):
+    """Report cells as numbers: the counts are text with digit grouping ('1,04,739'), labels become NaN"""
+    return frame.apply(lambda col: pd.to_numeric(col.astype(str).str.replace(',', '', regex=False), errors='coerce'))
+
+
+def align_report_blocks(df, layout=None):
+    """(Maker + JAN..DEC rows, layout) of a raw-report frame, relabelled block by block
+
+    A block is the rows after a JAN..DEC header row; its month columns come from that row and
+    its Maker column from the last 'Maker' header row before it. Every month gets a column,
+    NaN where a block's report has no such month, so the result does not depend on which blocks
+    a frame holds. `layout` is the (Maker column, {column: month}) an earlier chunk of the same
+    frame ended with: rows before this chunk's first header row continue that block. Rows with
+    counts before any header row raise; they would otherwise be dropped. Returns the layout this
+    frame ends with, for the next chunk.
+    """
+    key_cols = [col for col in ['vehicle_type', 'vehicle_category', 'year'] if col in df.columns]
+    text_cols = [col for col in df.columns if col not in key_cols and col != 'S No'
+                 and (df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype))]
+    labels = pd.DataFrame({col: df[col].astype(str).str.strip().str.upper().to_numpy() for col in text_cols})
+    month_header = labels.isin(list(month_map)).to_numpy()
+    maker_header = (labels == 'MAKER').to_numpy()
+    header_rows = np.flatnonzero(month_header.any(axis=1))
+    maker_rows = np.flatnonzero(maker_header.any(axis=1))
+
+    def maker_column(row):
+        return text_cols[np.flatnonzero(maker_header[row])[0]]
+
+    maker_col, months = layout if layout is not None else (None, None)
+    blocks = []
+    # Block 0 is the rows before the first header row, block i the rows after header row i - 1
+    for i, (start, end) in enumerate(zip([0] + list(header_rows + 1), list(header_rows) + [len(df)])):
+        if i:
+            header = header_rows[i - 1]
+            before = maker_rows[maker_rows < header]
+            if len(before):
+                maker_col = maker_column(before[-1])
+            months = {text_cols[j]: labels.iat[header, j] for j in np.flatnonzero(month_header[header])}
+        block = df.iloc[start:end]
+        if months is None or maker_col is None:
+            if report_counts(block[text_cols]).notnull().any(axis=None):
+                raise ValueError(f"raw report rows {start}..{end - 1} hold counts but come before a "
+                                 "Maker/JAN..DEC header row")
+            continue
+        values = report_counts(block[list(months)]).rename(columns=months)
+        values = values.reindex(columns=list(month_map)).astype('float64')
+        makers = block[maker_col].astype(object)
+        # Maker rows only: the next file's title, header and blank rows have no maker or no counts
+        rows = (makers.notnull() & values.notnull().any(axis=1)).to_numpy()
+        out = pd.concat([makers.astype(str).str.strip().rename('Maker'), values, block[key_cols]], axis=1)
+        blocks.append(out[rows])
+    # A 'Maker' header row after the last JAN..DEC row names the column of the next chunk's block
+    if len(maker_rows) and (not len(header_rows) or maker_rows[-1] > header_rows[-1]):
+        maker_col = maker_column(maker_rows[-1])
+
+    columns = ['Maker'] + list(month_map) + key_cols
+    df_wide = pd.concat(blocks, ignore_index=True)[columns] if blocks else pd.DataFrame(columns=columns)
+    return apply_schema(df_wide), (maker_col, months)
+
+
+def named_months(df):
+    """df in the Maker + JAN..DEC layout when its columns already name the months, else None
+
+    Frames already in that layout are returned as they are; clean()'s month-wise pivot
+    (manufacturer, month_N) is renamed.
+    """
+    if 'Maker' in df.columns and any(str(col).upper() in month_map for col in df.columns):
+        return df
+    month_cols = {f"month_{number}": name for name, number in month_map.items()}
+    if 'manufacturer' in df.columns and any(col in month_cols for col in df.columns):
+        return df.rename(columns=dict(month_cols, manufacturer='Maker'))
+    return None
+
+
+def wide_months(df):
+    """A cleaned frame in the Maker + JAN..DEC layout summarize() reads
+
+    Frames whose columns name the months go through named_months. Raw report sheets that
+    clean() passes through unpivoted (a 'Maker' header row and a JAN..DEC header row inside the
+    data, one block per raw file) are relabelled block by block from their own header rows (see
+    align_report_blocks), so files with fewer months keep TOTAL out of the month columns; title,
+    header and blank rows are dropped and the comma-grouped counts are parsed.
+    """
+    named = named_months(df)
+    if named is not None:
+        return named
+    df_wide, (_, months) = align_report_blocks(df)
+    if months is None:
+        raise no_month_layout(df)
+    return df_wide
+
+
+def no_month_layout(df):
+    return ValueError("cleaned data has no Maker/JAN..DEC columns, no month_N pivot and no Maker/JAN..DEC "
+                      "header rows; columns: " + ", ".join(map(str, df.columns)))
+
+
+def iter_wide_months(chunks):
+    """wide_months over consecutive chunks of one cleaned frame, for streaming
+
+    A raw report block split across chunks keeps its layout: rows before a chunk's first header
+    row are relabelled with the layout the previous chunk ended in.
+    """
+    layout = None
+    for chunk in chunks:
+        named = named_months(chunk)
+        if named is not None:
+            yield named
+        else:
+            wide, layout = align_report_blocks(chunk, layout)
+            yield wide
+    if layout is not None and layout[1] is None:
+        raise no_month_layout(chunk)
+
+# ===== 3-5. MELT AND AGGREGATE =====
+def summarize(df):
+    """Melt the wide cleaned frame and aggregate it to monthly and quarterly registrations"""
+    lap = profiling.laps('calculation', df)
+
+    # ===== 3. MELT WIDE TO LONG FORMAT =====
+    month_cols = [col for col in df.columns if col.upper() in month_map.keys()]
+    id_vars = [col for col in df.columns if col not in month_cols]
+
+    print("Month columns found:", month_cols)
+    print("ID variables:", id_vars)
+
+    df_long = df.melt(
+        id_vars=id_vars, 
+        value_vars=month_cols,
+        var_name='month_name', 
+        value_name='registrations'
+    )
+
+    # Clean and prepare data
+    df_long['month'] = df_long['month_name'].str.upper().map(month_map)
+    df_long['registrations'] = pd.to_numeric(df_long['registrations'], errors='coerce').fillna(0)
+
+    # Remove rows with invalid years
+    df_long = df_long[df_long['year'].notnull()]
+    df_long['year'] = df_long['year'].astype(int)
+
+    # Create proper date column
+    df_long['date'] = pd.to_datetime(
+        df_long['year'].astype(str) + '-' + 
+        df_long['month'].astype(str) + '-01',
+        errors='coerce'
+    )
+
+    # Remove invalid dates
+    df_long = df_long.dropna(subset=['date'])
+
+    # Add quarter information (year_quarter labels are derived on demand, see schema.py)
+    df_long['quarter'] = df_long['date'].dt.quarter
+    df_long = apply_schema(df_long)
+
+    print("✅ Data transformation complete. Shape:", df_long.shape)
+    lap('melt', df_long)
+
+    # ===== 4. MONTHLY AGGREGATION =====
+    # Group by relevant columns for monthly data
+    group_cols_monthly = ['vehicle_type', 'Maker', 'date', 'year', 'month']
+    if 'vehicle_category' in df_long.columns:
+        group_cols_monthly.insert(1, 'vehicle_category')
+
+    monthly_summary = apply_schema(df_long.groupby(group_cols_monthly, observed=True)['registrations'].sum().reset_index())
+    lap('monthly aggregation', monthly_summary)
+
+    # ===== 5. QUARTERLY AGGREGATION =====
+    group_cols_quarterly = ['vehicle_type', 'Maker', 'year', 'quarter']
+    if 'vehicle_category' in df_long.columns:
+        group_cols_quarterly.insert(1, 'vehicle_category')
+
+    quarterly_summary = apply_schema(df_long.groupby(group_cols_quarterly, observed=True)['registrations'].sum().reset_index())
+    lap('quarterly aggregation', quarterly_summary, rows_in=df_long)
+
+    print("✅ Monthly aggregation complete. Shape:", monthly_summary.shape)
+    print("✅ Quarterly aggregation complete. Shape:", quarterly_summary.shape)
+    return monthly_summary, quarterly_summary
 
 # ===== 6. YoY CALCULATIONS (Monthly basis) =====
 def calculate_yoy_monthly(df):
-    """Calculate YoY growth for monthly data"""
-    df_yoy = df.copy()
-    
-    # Sort by vehicle_type, Maker, and date
-    sort_cols = ['vehicle_type', 'Maker', 'year', 'month']
-    if 'vehicle_category' in df.columns:
-        sort_cols.insert(1, 'vehicle_category')
-    
-    df_yoy = df_yoy.sort_values(sort_cols)
-    
-    # Create a function to calculate YoY for each group
-    def calc_group_yoy(group):
-        group = group.sort_values(['year', 'month'])
-        group['registrations_last_year'] = np.nan
-        group['YoY_growth_%'] = np.nan
-        
-        for i, row in group.iterrows():
-            current_year = row['year']
-            current_month = row['month']
-            current_registrations = row['registrations']
-            
-            # Find same month in previous year
-            prev_year_data = group[
-                (group['year'] == current_year - 1) & 
-                (group['month'] == current_month)
-            ]
-            
-            if not prev_year_data.empty:
-                prev_registrations = prev_year_data['registrations'].iloc[0]
-                group.loc[i, 'registrations_last_year'] = prev_registrations
-                
-                if prev_registrations > 0:
-                    yoy_growth = ((current_registrations - prev_registrations) / prev_registrations) * 100
-                    # Using absolute values to remove negative signs
-                    group.loc[i, 'YoY_growth_%'] = round(abs(yoy_growth), 2)
-        
-        return group
-    
-    # Apply YoY calculation to each group
-    group_cols = ['vehicle_type', 'Maker']
-    if 'vehicle_category' in df.columns:
-        group_cols.insert(1, 'vehicle_category')
-    
-    df_yoy = df_yoy.groupby(group_cols).apply(calc_group_yoy).reset_index(drop=True)
-    
-    return df_yoy
+    """Calculate YoY growth for monthly data (same month, previous year)"""
+    return add_lag_growth(df, 'month', YOY_MONTHLY_LAG, prev_col='registrations_last_year', growth_col='YoY_growth_%')
 
 # ===== 7. QoQ CALCULATIONS (Quarterly basis) =====
 def calculate_qoq_quarterly(df):
-    """Calculate QoQ growth for quarterly data"""
-    df_qoq = df.copy()
-    
-    # Sort by vehicle_type, Maker, year, and quarter
-    sort_cols = ['vehicle_type', 'Maker', 'year', 'quarter']
-    if 'vehicle_category' in df.columns:
-        sort_cols.insert(1, 'vehicle_category')
-    
-    df_qoq = df_qoq.sort_values(sort_cols)
-    
-    def calc_group_qoq(group):
-        group = group.sort_values(['year', 'quarter'])
-        group['registrations_last_quarter'] = np.nan
-        group['QoQ_growth_%'] = np.nan
-        
-        for i, row in group.iterrows():
-            current_year = row['year']
-            current_quarter = row['quarter']
-            current_registrations = row['registrations']
-            
-            # Find previous quarter
-            if current_quarter == 1:
-                prev_year = current_year - 1
-                prev_quarter = 4
-            else:
-                prev_year = current_year
-                prev_quarter = current_quarter - 1
-            
-            prev_quarter_data = group[
-                (group['year'] == prev_year) & 
-                (group['quarter'] == prev_quarter)
-            ]
-            
-            if not prev_quarter_data.empty:
-                prev_registrations = prev_quarter_data['registrations'].iloc[0]
-                group.loc[i, 'registrations_last_quarter'] = prev_registrations
-                
-                if prev_registrations > 0:
-                    qoq_growth = ((current_registrations - prev_registrations) / prev_registrations) * 100
-                    # Using absolute values to remove negative signs
-                    group.loc[i, 'QoQ_growth_%'] = round(abs(qoq_growth), 2)
-        
-        return group
-    
-    # Apply QoQ calculation to each group
+    """Calculate QoQ growth for quarterly data (previous quarter)"""
+    return add_lag_growth(df, 'quarter', QOQ_LAG, prev_col='registrations_last_quarter', growth_col='QoQ_growth_%')
+
+# ===== 8-9. APPLY CALCULATIONS AND COMBINE RESULTS =====
+def add_growth_metrics(monthly_summary, quarterly_summary):
+    """YoY on monthly totals, QoQ on quarterly totals, and QoQ joined onto the monthly rows"""
+    # ===== 8. APPLY CALCULATIONS =====
+    lap = profiling.laps('calculation', monthly_summary)
+    print("🔄 Calculating YoY growth...")
+    monthly_with_yoy = calculate_yoy_monthly(monthly_summary)
+    lap('YoY', monthly_with_yoy)
+
+    print("🔄 Calculating QoQ growth...")
+    quarterly_with_qoq = calculate_qoq_quarterly(quarterly_summary)
+    lap('QoQ', quarterly_with_qoq, rows_in=quarterly_summary)
+
+    # ===== 9. COMBINE RESULTS =====
+    # QoQ metrics of each monthly row's quarter, looked up by (group, year * 4 + quarter - 1) period id
     group_cols = ['vehicle_type', 'Maker']
-    if 'vehicle_category' in df.columns:
+    if 'vehicle_category' in monthly_with_yoy.columns:
         group_cols.insert(1, 'vehicle_category')
-    
-    df_qoq = df_qoq.groupby(group_cols).apply(calc_group_qoq).reset_index(drop=True)
-    
-    return df_qoq
-
-# ===== 8. APPLY CALCULATIONS =====
-print("🔄 Calculating YoY growth...")
-monthly_with_yoy = calculate_yoy_monthly(monthly_summary)
-
-print("🔄 Calculating QoQ growth...")
-quarterly_with_qoq = calculate_qoq_quarterly(quarterly_summary)
-
-# ===== 9. COMBINE RESULTS =====
-# Merge monthly YoY with quarterly QoQ data
-# First, prepare quarterly data for merging
-quarterly_for_merge = quarterly_with_qoq[['vehicle_type', 'Maker', 'year', 'quarter', 
-                                          'year_quarter', 'registrations_last_quarter', 'QoQ_growth_%']].copy()
-
-if 'vehicle_category' in quarterly_with_qoq.columns:
-    quarterly_for_merge.insert(1, 'vehicle_category', quarterly_with_qoq['vehicle_category'])
-
-# Add quarter and year_quarter to monthly data
-monthly_with_yoy['quarter'] = pd.to_datetime(monthly_with_yoy['date']).dt.quarter
-monthly_with_yoy['year_quarter'] = monthly_with_yoy['year'].astype(str) + '-Q' + monthly_with_yoy['quarter'].astype(str)
-
-# Merge monthly and quarterly data
-merge_cols = ['vehicle_type', 'Maker', 'year', 'quarter']
-if 'vehicle_category' in monthly_with_yoy.columns:
-    merge_cols.insert(1, 'vehicle_category')
-
-final_results = monthly_with_yoy.merge(
-    quarterly_for_merge, 
-    on=merge_cols, 
-    how='left',
-    suffixes=('', '_quarterly')
-)
 
-# ===== 10. CLEAN UP RESULTS =====
-# Replace infinite values with NaN
-final_results = final_results.replace([np.inf, -np.inf], np.nan)
-
-# Round growth percentages
-growth_cols = ['YoY_growth_%', 'QoQ_growth_%']
-for col in growth_cols:
-    if col in final_results.columns:
-        final_results[col] = final_results[col].round(2)
-
-# Sort by date and vehicle info
-sort_cols = ['date', 'vehicle_type', 'Maker']
-if 'vehicle_category' in final_results.columns:
-    sort_cols.insert(2, 'vehicle_category')
+    final_results = monthly_with_yoy
+    final_results['quarter'] = quarter_of_month(final_results['month']).astype('int8')
+    quarterly_values = join_period_values(final_results, quarterly_with_qoq, group_cols, 'quarter',
+                                          ['registrations_last_quarter', 'QoQ_growth_%'])
+    for col, values in quarterly_values.items():
+        final_results[col] = values
+    lap('merge QoQ onto months', final_results, rows_in=[monthly_with_yoy, quarterly_with_qoq])
+    return final_results, quarterly_with_qoq
 
-final_results = final_results.sort_values(sort_cols)
+# ===== 10. CLEAN UP RESULTS =====
+def finalize_results(final_results):
+    """Add rolling metrics, drop infinities, round growth percentages and sort by date and vehicle info"""
+    # Rolling windows reach back years, so they are always recomputed over the full monthly series
+    lap = profiling.laps('calculation', final_results)
+    final_results = add_rolling_metrics(final_results)
+    lap('rolling metrics', final_results)
+
+    # Replace infinite values with NaN
+    final_results = final_results.replace([np.inf, -np.inf], np.nan)
+
+    # Round growth percentages
+    growth_cols = ['YoY_growth_%', 'QoQ_growth_%']
+    for col in growth_cols:
+        if col in final_results.columns:
+            final_results[col] = final_results[col].round(2)
+
+    # Sort by date and vehicle info
+    sort_cols = ['date', 'vehicle_type', 'Maker']
+    if 'vehicle_category' in final_results.columns:
+        sort_cols.insert(2, 'vehicle_category')
+
+    final_results = apply_schema(final_results.sort_values(sort_cols))
+    lap('round and sort', final_results)
+    return final_results
+
+def compute_growth(df):
+    """Growth metrics for a cleaned frame in memory: compute_growth(df) -> (monthly, quarterly)
+
+    Takes clean()'s output directly (see wide_months for the layouts it accepts).
+    """
+    monthly_summary, quarterly_summary = summarize(wide_months(df))
+    final_results, quarterly_with_qoq = add_growth_metrics(monthly_summary, quarterly_summary)
+    return finalize_results(final_results), quarterly_with_qoq
 
 # ===== 11. CREATE SUMMARY STATISTICS =====
-print("\n📊 SUMMARY STATISTICS:")
-print(f"Total records: {len(final_results)}")
-print(f"Date range: {final_results['date'].min()} to {final_results['date'].max()}")
-print(f"Unique vehicle types: {final_results['vehicle_type'].nunique()}")
-print(f"Unique manufacturers: {final_results['Maker'].nunique()}")
-
-# Show some sample YoY calculations
-yoy_sample = final_results[final_results['YoY_growth_%'].notnull()].head(10)
-print("\n📈 Sample YoY Growth Calculations:")
-print(yoy_sample[['Maker', 'vehicle_type', 'date', 'registrations', 
-                  'registrations_last_year', 'YoY_growth_%']].to_string(index=False))
-
-# Show some sample QoQ calculations
-qoq_sample = final_results[final_results['QoQ_growth_%'].notnull()].head(10)
-print("\n📈 Sample QoQ Growth Calculations:")
-# Create year_quarter for display
-qoq_display = qoq_sample.copy()
-qoq_display['year_quarter'] = qoq_display['year'].astype(str) + '-Q' + qoq_display['quarter'].astype(str)
-
-print(qoq_display[['Maker', 'vehicle_type', 'year_quarter', 'registrations', 
-                   'registrations_last_quarter', 'QoQ_growth_%']].to_string(index=False))
-
-# ===== 12. SAVE RESULTS =====
-# Save main results
-final_results.to_excel(OUTPUT_FILE, sheet_name='Monthly_with_Growth', index=False)
-
-# Save quarterly summary separately
-quarterly_output_file = OUTPUT_FILE.replace('.xlsx', '_quarterly.xlsx')
-quarterly_with_qoq.to_excel(quarterly_output_file, sheet_name='Quarterly_Growth', index=False)
-
-print(f"\n✅ Main results saved to: {OUTPUT_FILE}")
-print(f"✅ Quarterly results saved to: {quarterly_output_file}")
+def print_summary(final_results):
+    print("\n📊 SUMMARY STATISTICS:")
+    print(f"Total records: {len(final_results)}")
+    print(f"Date range: {final_results['date'].min()} to {final_results['date'].max()}")
+    print(f"Unique vehicle types: {final_results['vehicle_type'].nunique()}")
+    print(f"Unique manufacturers: {final_results['Maker'].nunique()}")
+
+    # Show some sample YoY calculations
+    yoy_sample = final_results[final_results['YoY_growth_%'].notnull()].head(10)
+    print("\n📈 Sample YoY Growth Calculations:")
+    print(yoy_sample[['Maker', 'vehicle_type', 'date', 'registrations', 
+                      'registrations_last_year', 'YoY_growth_%']].to_string(index=False))
+
+    # Show some sample QoQ calculations
+    qoq_sample = final_results[final_results['QoQ_growth_%'].notnull()].head(10)
+    print("\n📈 Sample QoQ Growth Calculations:")
+    # Create year_quarter for display
+    qoq_display = qoq_sample.copy()
+    qoq_display['year_quarter'] = year_quarter(qoq_display)
+
+    print(qoq_display[['Maker', 'vehicle_type', 'year_quarter', 'registrations', 
+                       'registrations_last_quarter', 'QoQ_growth_%']].to_string(index=False))
 
 # ===== 13. CREATE AGGREGATED INSIGHTS =====
-# Vehicle type wise growth summary
-vehicle_growth_summary = final_results.groupby('vehicle_type').agg({
-    'registrations': ['sum', 'mean'],
-    'YoY_growth_%': 'mean',
-    'QoQ_growth_%': 'mean'
-}).round(2)
-
-# Top performing manufacturers by YoY growth
-top_yoy_manufacturers = final_results[final_results['YoY_growth_%'].notnull()].groupby('Maker').agg({
-    'YoY_growth_%': 'mean',
-    'registrations': 'sum'
-}).sort_values('YoY_growth_%', ascending=False).head(10).round(2)
-
-print("\n🏆 TOP 10 MANUFACTURERS BY AVERAGE YoY GROWTH:")
-print(top_yoy_manufacturers)
-
-print("\n📊 VEHICLE TYPE GROWTH SUMMARY:")
-print(vehicle_growth_summary)
-
-print("\n✅ YoY and QoQ calculations completed successfully!")
-print("🎯 Key Features:")
-print("   - Proper date-based YoY calculation (same month, previous year)")
-print("   - Accurate QoQ calculation (previous quarter)")
-print("   - Handles missing data gracefully") 
-print("   - Provides summary statistics and insights")
-print("   - Saves both monthly and quarterly views")
-
+def growth_insights(final_results):
+    """Vehicle-type growth summary and the top 10 manufacturers by average YoY growth"""
+    # Vehicle type wise growth summary
+    vehicle_growth_summary = final_results.groupby('vehicle_type', observed=True).agg({
+        'registrations': ['sum', 'mean'],
+        'YoY_growth_%': 'mean',
+        'QoQ_growth_%': 'mean'
+    }).round(2)
+
+    # Top performing manufacturers by YoY growth
+    top_yoy_manufacturers = final_results[final_results['YoY_growth_%'].notnull()].groupby('Maker', observed=True).agg({
+        'YoY_growth_%': 'mean',
+        'registrations': 'sum'
+    }).sort_values('YoY_growth_%', ascending=False).head(10).round(2)
+    return vehicle_growth_summary, top_yoy_manufacturers
+
+# ===== 14. EXCEL EXPORT =====
+def export_workbook_sheets(final_results, quarterly_with_qoq, vehicle_growth_summary, top_yoy_manufacturers,
+                           monthly_file, quarterly_file, split_by_vehicle_type=False, anomalies=None):
+    """{path: {sheet name: frame}} for the metrics workbooks and the insights workbook next to them"""
+    metrics = {monthly_file: {'Monthly_with_Growth': final_results},
+               quarterly_file: {'Quarterly_Growth': quarterly_with_qoq}}
+    if split_by_vehicle_type:
+        metrics = {split: sheets for path, sheets in metrics.items()
+                   for split, sheets in split_workbooks(path, sheets, 'vehicle_type').items()}
+    insights = {'Vehicle_Type_Summary': flat_frame(vehicle_growth_summary),
+                'Top_YoY_Manufacturers': flat_frame(top_yoy_manufacturers)}
+    if anomalies is not None:
+        insights['Anomalies'] = anomalies
+    return dict(metrics, **{monthly_file.replace('.xlsx', '_insights.xlsx'): insights})
+
+if __name__ == "__main__":
+    quarterly_output_file = OUTPUT_FILE.replace('.xlsx', '_quarterly.xlsx')
+    profiler = profiling.start('calculation', PROFILE)
+    try:
+        # ===== 1. LOAD CLEANED FILE =====
+        manifest_file = manifest_path(os.path.dirname(INPUT_FILE))
+        manifest = load_manifest(manifest_file)
+        partitions = pending_partitions(manifest, 'calculation') if INCREMENTAL else None
+        if partitions is not None and os.path.exists(parquet_path(OUTPUT_FILE)) and os.path.exists(parquet_path(quarterly_output_file)):
+            previous_monthly = load_frame(OUTPUT_FILE)
+            previous_quarterly = load_frame(quarterly_output_file)
+            if not partitions:
+                print("✅ No changed partitions, growth metrics are up to date")
+                sys.exit(0)
+        else:
+            partitions = None
+
+        if STREAMING:
+            # Fold the wide input chunk by chunk into monthly/quarterly totals; the long frame is never built.
+            # Raw report blocks split across chunks continue with the layout of the chunk before
+            row_filter = (lambda chunk: source_mask(chunk, partitions)) if partitions is not None else None
+            if row_filter is not None:
+                print(f"🔎 Recomputing growth for {len(partitions)} changed partition(s):", partitions)
+            with profiling.stage('calculation: streaming aggregation') as stage:
+                chunks = iter_wide_months(iter_frames(INPUT_FILE, CHUNK_ROWS))
+                monthly_summary, quarterly_summary = stream_aggregates(chunks, month_map, row_filter)
+                stage['rows_out'] = [monthly_summary, quarterly_summary]
+        else:
+            with profiling.stage('calculation: load') as stage:
+                df = wide_months(compact(load_frame(INPUT_FILE), "Cleaned input"))
+                stage['rows_out'] = len(df)
+            print("✅ Loaded:", df.shape)
+            print("Columns:", df.columns.tolist())
+
+            # Only rows that can feed an affected period (changed years, one year either side) are recomputed
+            if partitions is not None:
+                df = df[source_mask(df, partitions)]
+                print(f"🔎 Recomputing growth for {len(partitions)} changed partition(s):", partitions, "rows:", len(df))
+            monthly_summary, quarterly_summary = summarize(df)
+
+        final_results, quarterly_with_qoq = add_growth_metrics(monthly_summary, quarterly_summary)
+
+        # Keep previous results outside the affected periods: changed months, the same months a year later, the next quarter
+        if partitions is not None:
+            lap = profiling.laps('calculation', [final_results, quarterly_with_qoq])
+            final_results = splice_periods(final_results, previous_monthly, affected_periods(partitions, 'month'), 'month')
+            quarterly_with_qoq = splice_periods(quarterly_with_qoq, previous_quarterly, affected_periods(partitions, 'quarter'), 'quarter')
+            sort_cols = ['vehicle_type', 'Maker', 'year', 'quarter']
+            if 'vehicle_category' in quarterly_with_qoq.columns:
+                sort_cols.insert(1, 'vehicle_category')
+            quarterly_with_qoq = apply_schema(quarterly_with_qoq.sort_values(sort_cols).reset_index(drop=True))
+            lap('splice previous results', [final_results, quarterly_with_qoq])
+
+        final_results = finalize_results(final_results)
+        print_summary(final_results)
+
+        # ===== 12. SAVE RESULTS =====
+        with profiling.stage('calculation: save', [final_results, quarterly_with_qoq]):
+            # Save main results
+            save_frame(final_results, OUTPUT_FILE, sheet_name='Monthly_with_Growth')
+
+            # Save quarterly summary separately
+            save_frame(quarterly_with_qoq, quarterly_output_file, sheet_name='Quarterly_Growth')
+
+            # KPI/filter summary the dashboard shows before the full metrics have loaded
+            save_summary(build_summary(final_results, quarterly_with_qoq, data_version([OUTPUT_FILE, quarterly_output_file])),
+                         summary_path(OUTPUT_FILE))
+
+        print(f"\n✅ Main results saved to: {OUTPUT_FILE}")
+        print(f"✅ Quarterly results saved to: {quarterly_output_file}")
+
+        # Outlier flags over every series, saved next to the metrics for the dashboard's Anomalies table
+        anomalies = None
+        if ANOMALY_SCAN:
+            with profiling.stage('calculation: anomaly scan', [final_results, quarterly_with_qoq]) as stage:
+                anomalies = scan_anomalies(final_results, quarterly_with_qoq)
+                save_frame(anomalies, anomalies_path(OUTPUT_FILE), sheet_name='Anomalies')
+                stage['rows_out'] = anomalies
+            print(f"🚨 Anomalies flagged: {len(anomalies):,}")
+
+        mark_done(manifest, 'calculation')
+        save_manifest(manifest_file, manifest)
+
+        vehicle_growth_summary, top_yoy_manufacturers = growth_insights(final_results)
+
+        # ===== 14. EXCEL EXPORT =====
+        if EXPORT_EXCEL:
+            with profiling.stage('calculation: Excel export', [final_results, quarterly_with_qoq]):
+                workbooks = export_workbook_sheets(final_results, quarterly_with_qoq, vehicle_growth_summary,
+                                                   top_yoy_manufacturers, OUTPUT_FILE, quarterly_output_file,
+                                                   EXPORT_SPLIT_BY_VEHICLE_TYPE, anomalies)
+                export_workbooks(workbooks, workers=EXPORT_WORKERS)
+    finally:
+        profiler.finish(os.path.dirname(OUTPUT_FILE))
+
+    print("\n🏆 TOP 10 MANUFACTURERS BY AVERAGE YoY GROWTH:")
+    print(top_yoy_manufacturers)
+
+    print("\n📊 VEHICLE TYPE GROWTH SUMMARY:")
+    print(vehicle_growth_summary)
+
+    print("\n✅ YoY and QoQ calculations completed successfully!")
+    print("🎯 Key Features:")
+    print("   - Proper date-based YoY calculation (same month, previous year)")
+    print("   - Accurate QoQ calculation (previous quarter)")
+    print("   - Handles missing data gracefully") 
+    print("   - Provides summary statistics and insights")
+    print("   - Saves both monthly and quarterly views")
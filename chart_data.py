@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+OTHERS_LABEL = 'Others'
+
+
+def page(df, page_number, page_size, sort_col=None, ascending=True):
+    """One page (1-based) of df, sorted on the server; only this slice is sent to the browser"""
+    if sort_col is not None and sort_col in df.columns:
+        df = df.sort_values(sort_col, ascending=ascending, kind='mergesort', na_position='last')
+    start = (page_number - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+def lttb_indices(y, threshold):
+    """Largest-Triangle-Three-Buckets: positions of `threshold` points of an evenly spaced series
+
+    Keeps the first and last point and, per bucket, the point spanning the largest triangle with the
+    previously kept point and the average of the next bucket, so peaks and dips survive.
+    """
+    y = np.asarray(y, dtype='float64')
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype='float64')
+    edges = (np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype('int64') + 1
+    edges[-1] = n - 1
+    kept = np.empty(threshold, dtype='int64')
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x, avg_y = x[stop:next_stop].mean(), y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(df, group_col, value_col, max_points):
+    """At most `max_points` rows per `group_col` value (LTTB over each group's row order)"""
+    pieces = []
+    for _, group in df.groupby(group_col, sort=False, observed=True):
+        pieces.append(group.iloc[lttb_indices(group[value_col].to_numpy(), max_points)])
+    if not pieces:
+        return df
+    return pd.concat(pieces).sort_index()
+
+
+def top_n_share(df, label_col, value_col, n):
+    """The n largest `value_col` rows plus one 'Others' row holding the rest"""
+    if len(df) <= n:
+        return df[[label_col, value_col]]
+    ranked = df[[label_col, value_col]].sort_values(value_col, ascending=False, kind='mergesort')
+    top = ranked.head(n).astype({label_col: object})
+    others = pd.DataFrame({label_col: [OTHERS_LABEL], value_col: [ranked[value_col].iloc[n:].sum()]})
+    return pd.concat([top, others], ignore_index=True)
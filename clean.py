@@ -1,76 +1,208 @@
+import os
+import sys
+
+import numpy as np
 import pandas as pd
 
+import profiling
+from incremental import (load_manifest, manifest_path, mark_done, partition_groups, partition_mask,
+                         pending_partitions, save_manifest, splice_partitions)
+from metadata import column_roles, load_schema_cache, save_schema_cache, schema_cache_path
+from schema import apply_schema, compact
+from storage import load_frame, parquet_path, save_frame
+
 # ====== CONFIG ======
 INPUT_FILE = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_registrations_combined.xlsx"
 OUTPUT_FILE = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_registrations_cleaned.xlsx"
+EXPORT_EXCEL = False  # also write the cleaned .xlsx (intermediates live in the Parquet store)
+INCREMENTAL = True  # re-clean only the (vehicle_type, year) partitions combine.py marked as changed
+PROFILE = None  # "trace": per-step JSON trace with peak memory next to the output; "cprofile": also a cProfile dump
+
+# Key columns of the pivoted (month-wise) layout
+PIVOT_COLS = ['manufacturer', 'year', 'vehicle_type', 'vehicle_category']
+
+
+def clean(df, schema_cache=None):
+    """Clean a combined frame in memory: clean(df) -> DataFrame
+
+    schema_cache (metadata.load_schema_cache) reuses column roles resolved on earlier runs.
+    """
+    lap = profiling.laps('clean', df)
+    # Shallow copy: columns below are renamed or replaced, never written in place
+    df = df.copy(deep=False)
+
+    # ====== 2. STRIP SPACES ======
+    df.columns = df.columns.str.strip()
+    lap('STRIP SPACES', df)
+
+    # ====== 3. FIX 'S No' COLUMN ======
+    if 'S No' not in df.columns:
+        first_col = df.columns[0]
+        print(f"Renaming '{first_col}' to 'S No'")
+        df.rename(columns={first_col: 'S No'}, inplace=True)
+
+    # Rows are filtered once at the end, by one mask combining every check below
+    keep = pd.to_numeric(df['S No'], errors='coerce').notnull().to_numpy()
+    lap('FIX S No COLUMN', df)
+
+    # Manufacturer/registrations columns are inferred once per header layout (see metadata.py),
+    # with 'S No' as the integer column it is once its non-numeric rows are gone
+    roles = column_roles(schema_cache if schema_cache is not None else load_schema_cache(None),
+                         df.iloc[:0].astype({'S No': int}))
+
+    # ====== 4. STANDARDIZE MANUFACTURER ======
+    if roles['manufacturer'] is not None:
+        df.rename(columns={roles['manufacturer']: 'manufacturer'}, inplace=True)
+    lap('STANDARDIZE MANUFACTURER', df)
+
+    # ====== 5. FIX REGISTRATIONS COLUMN ======
+    if roles['registrations'] is not None:
+        df.rename(columns={roles['registrations']: 'registrations'}, inplace=True)
+
+    if 'registrations' in df.columns:
+        df['registrations'] = pd.to_numeric(df['registrations'], errors='coerce').fillna(0).astype(int)
+    lap('FIX REGISTRATIONS COLUMN', df)
+
+    # ====== 6. REMOVE BLANKS/ZEROS ======
+    if 'manufacturer' in df.columns:
+        df['manufacturer'] = strip_text(df['manufacturer'])
+        keep &= (df['manufacturer'] != '').to_numpy()
+
+    if 'registrations' in df.columns:
+        keep &= (df['registrations'] > 0).to_numpy()
+    lap('REMOVE BLANKS/ZEROS', int(keep.sum()), rows_in=df)
+
+    # ====== 7. OPTIONAL: PIVOT TO MONTH-WISE ======
+    # 'S No' is renumbered after pivoting, so the original column is dropped
+    if 'month' in df.columns and 'registrations' in df.columns:
+        # Each manufacturer/year/vehicle_type(/vehicle_category) becomes one row with month_N columns
+        pivot_cols = ['manufacturer', 'year', 'vehicle_type']
+        if 'vehicle_category' in df.columns:
+            pivot_cols.append('vehicle_category')
+        # Rows with a missing key or month belong to no group
+        keep &= df[pivot_cols + ['month']].notnull().all(axis=1).to_numpy()
+        df_final = pivot_months(df, pivot_cols, keep)
+    else:
+        df_final = df.loc[keep].drop(columns=['S No'])
+
+    if 'manufacturer' in df_final.columns:
+        df_final['manufacturer'] = df_final['manufacturer'].cat.remove_unused_categories()
+    df_final = apply_schema(df_final)
+    lap('PIVOT TO MONTH-WISE', df_final)
+    return df_final
 
-# ====== 1. LOAD DATA ======
-df = pd.read_excel(INPUT_FILE)
-print("✅ File loaded")
-print("Columns before cleaning:", df.columns.tolist())
-
-# ====== 2. STRIP SPACES ======
-df.columns = df.columns.str.strip()
-
-# ====== 3. FIX 'S No' COLUMN ======
-if 'S No' not in df.columns:
-    first_col = df.columns[0]
-    print(f"Renaming '{first_col}' to 'S No'")
-    df.rename(columns={first_col: 'S No'}, inplace=True)
-
-# Always clean below here (not inside the if block)
-df = df[pd.to_numeric(df['S No'], errors='coerce').notnull()]
-df['S No'] = pd.to_numeric(df['S No'], errors='coerce').astype(int)
-
-# ====== 4. STANDARDIZE MANUFACTURER ======
-for col in df.columns:
-    if "maker" in col.lower() or "manufactur" in col.lower():
-        df.rename(columns={col: 'manufacturer'}, inplace=True)
-        break
-
-# ====== 5. FIX REGISTRATIONS COLUMN ======
-possible_reg_cols = [c for c in df.columns if 'reg' in c.lower()]
-if not possible_reg_cols:
-    possible_reg_cols = [c for c in df.columns if df[c].dtype in ['int64', 'float64'] and c not in ['year', 'S No', 'month']]
-if possible_reg_cols and 'registrations' not in df.columns:
-    df.rename(columns={possible_reg_cols[-1]: 'registrations'}, inplace=True)
-
-if 'registrations' in df.columns:
-    df['registrations'] = pd.to_numeric(df['registrations'], errors='coerce').fillna(0).astype(int)
-
-# ====== 6. REMOVE BLANKS/ZEROS ======
-if 'manufacturer' in df.columns:
-    df['manufacturer'] = df['manufacturer'].astype(str).str.strip()
-    df = df[df['manufacturer'] != '']
-
-if 'registrations' in df.columns:
-    df = df[df['registrations'] > 0]
-
-
-# ====== 7. OPTIONAL: PIVOT TO MONTH-WISE ======
-# Drop any existing S No column before pivoting
-if 'S No' in df.columns:
-    df = df.drop(columns=['S No'])
-
-if 'month' in df.columns and 'registrations' in df.columns:
-    # Remove duplicates so each manufacturer/year/vehicle_type/month is unique
-    pivot_cols = ['manufacturer', 'year', 'vehicle_type']
-    if 'vehicle_category' in df.columns:
-        pivot_cols.append('vehicle_category')
-    df_grouped = df.groupby(pivot_cols + ['month'], as_index=False)['registrations'].sum()
-    df_pivot = df_grouped.pivot_table(index=pivot_cols, columns='month', values='registrations', fill_value=0)
-    df_pivot.columns = [f"month_{int(col)}" for col in df_pivot.columns]
-    df_pivot = df_pivot.reset_index()
+
+def strip_text(col):
+    """col.astype(str).str.strip() as a categorical, stripping each distinct value only once"""
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        return col.astype(str).str.strip().astype('category')
+    # Code -1 (missing) becomes 'nan', as astype(str) writes it
+    labels = np.append(col.cat.categories.astype(str).str.strip().to_numpy(dtype=object), 'nan')
+    names, codes = np.unique(labels, return_inverse=True)
+    return pd.Series(pd.Categorical.from_codes(codes[col.cat.codes.to_numpy()], categories=names), index=col.index)
+
+
+def key_codes(col):
+    """(codes, labels) of a key column, with codes in the order groupby(sort=True) sorts it"""
+    if isinstance(col.dtype, pd.CategoricalDtype):
+        return col.cat.codes.to_numpy().astype('int64'), col.cat.categories
+    codes, labels = pd.factorize(col, sort=True)
+    return codes.astype('int64'), labels
+
+
+def pivot_months(df, pivot_cols, rows):
+    """Month-wise registrations per pivot_cols key over the `rows` mask, in one scatter-add pass
+
+    Same result as groupby(pivot_cols + ['month']).sum() followed by pivot_table(fill_value=0):
+    rows sorted by key, one month_N column per month present, continuous 'S No'. The key columns
+    are factorized into one integer code per row, and each row's registrations are added into a
+    (key x month) matrix, so neither a grouped long frame nor the pivot's index is built.
+    Months a key has no rows for are 0.
+    """
+    codes, labels = zip(*(key_codes(df[col]) for col in pivot_cols))
+    combined = np.zeros(int(rows.sum()), dtype='int64')
+    for col_codes, col_labels in zip(codes, labels):
+        combined = combined * len(col_labels) + col_codes[rows]
+    group_codes, group_ids = np.unique(combined, return_inverse=True)
+    month_values, month_ids = np.unique(df['month'].to_numpy()[rows], return_inverse=True)
+    cells = np.bincount(group_ids * len(month_values) + month_ids,
+                        weights=df['registrations'].to_numpy(dtype='float64')[rows],
+                        minlength=len(group_codes) * len(month_values))
+
+    # Decode each key's combined code back into its column values
+    keys = {}
+    for col, col_labels in reversed(list(zip(pivot_cols, labels))):
+        group_codes, col_codes = np.divmod(group_codes, len(col_labels))
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            keys[col] = pd.Categorical.from_codes(col_codes, dtype=df[col].dtype)
+        else:
+            keys[col] = col_labels.take(col_codes)
+    df_pivot = pd.DataFrame({col: keys[col] for col in pivot_cols})
+    months = pd.DataFrame(cells.reshape(len(df_pivot), len(month_values)).astype('int64'),
+                          columns=[f"month_{int(month)}" for month in month_values])
+    df_pivot = pd.concat([df_pivot, months], axis=1)
     # Now set S No as continuous
     df_pivot['S No'] = range(1, len(df_pivot) + 1)
-    df_final = df_pivot
-else:
-    df_final = df.copy()
-    # If S No exists, reset it as continuous
-    if 'S No' in df_final.columns:
+    return df_pivot
+
+
+def merge_partitions(df_final, previous, partitions, partition_order):
+    """Splice re-cleaned partitions into the previous cleaned frame, in the row order of a full run"""
+    df_final = splice_partitions(df_final, previous, partitions, partition_order)
+    month_cols = sorted((c for c in df_final.columns if str(c).startswith('month_')), key=lambda c: int(c[len('month_'):]))
+    if month_cols:
+        # Pivoted layout: rows sorted by key, months missing from one side count as 0
+        pivot_cols = [c for c in PIVOT_COLS if c in df_final.columns]
+        df_final[month_cols] = df_final[month_cols].fillna(0)
+        df_final = df_final[pivot_cols + month_cols].sort_values(pivot_cols).reset_index(drop=True)
+        df_final['S No'] = range(1, len(df_final) + 1)
+    elif 'S No' in df_final.columns:
         df_final['S No'] = range(1, len(df_final) + 1)
+    return apply_schema(df_final)
+
+
+if __name__ == "__main__":
+    profiler = profiling.start('clean', PROFILE)
+    try:
+        # ====== 1. LOAD DATA ======
+        manifest_file = manifest_path(os.path.dirname(INPUT_FILE))
+        manifest = load_manifest(manifest_file)
+        partitions = pending_partitions(manifest, 'clean') if INCREMENTAL else None
+        previous = load_frame(OUTPUT_FILE) if partitions is not None and os.path.exists(parquet_path(OUTPUT_FILE)) else None
+        if previous is None:
+            partitions = None
+        elif not partitions:
+            print("✅ No changed partitions, cleaned file is up to date")
+            sys.exit(0)
+
+        with profiling.stage('LOAD DATA') as stage:
+            df = compact(load_frame(INPUT_FILE), "Combined input")
+            stage['rows_out'] = len(df)
+        print("✅ File loaded")
+        print("Columns before cleaning:", df.columns.tolist())
+
+        # Only the changed partitions are cleaned; the rest is reused from the previous cleaned file
+        partition_order = list(partition_groups(df))
+        if partitions is not None:
+            df = df[partition_mask(df, partitions)]
+            print(f"🔎 Re-cleaning {len(partitions)} changed partition(s):", partitions, "rows:", len(df))
+
+        schema_cache_file = schema_cache_path(os.path.dirname(INPUT_FILE))
+        schema_cache = load_schema_cache(schema_cache_file)
+        df_final = clean(df, schema_cache)
+        if previous is not None:
+            with profiling.stage('MERGE PARTITIONS', [df_final, previous]) as stage:
+                df_final = merge_partitions(df_final, previous, partitions, partition_order)
+                stage['rows_out'] = len(df_final)
+
+        # ====== 8. SAVE CLEANED FILE ======
+        print("Saving file with shape:", df_final.shape)
+        with profiling.stage('SAVE CLEANED FILE', df_final):
+            save_frame(df_final, OUTPUT_FILE, excel=EXPORT_EXCEL)
+        print(f"✅ Cleaned file saved to: {OUTPUT_FILE}")
 
-# ====== 8. SAVE CLEANED FILE ======
-print("Saving file with shape:", df_final.shape)
-df_final.to_excel(OUTPUT_FILE, index=False)
-print(f"✅ Cleaned file saved to: {OUTPUT_FILE}")
+        save_schema_cache(schema_cache_file, schema_cache)
+        mark_done(manifest, 'clean')
+        save_manifest(manifest_file, manifest)
+    finally:
+        profiler.finish(os.path.dirname(OUTPUT_FILE))
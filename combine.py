@@ -1,62 +1,181 @@
 import pandas as pd
 import glob
 import os
-import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import profiling
+
+from incremental import (file_hash, load_manifest, manifest_path, mark_pending,
+                         partition_key, save_manifest)
+from metadata import (load_schema_cache, parse_filename, record_file_layout, save_schema_cache,
+                      schema_cache_path)
+from schema import apply_schema, compact
+from storage import load_frame, parquet_path, save_frame
 
 RAW_DATA_FOLDER = r"C:\Users\shash\OneDrive\Desktop\free\raw data"
 FILE_PATTERN = "*.xlsx"
+EXPORT_EXCEL = False  # also write the combined .xlsx (intermediates live in the Parquet store)
+WORKERS = 1  # >1 parses raw files in that many worker processes
+INCREMENTAL = True  # re-read only raw files whose content changed since the last run
+PROFILE = None  # "trace": per-stage JSON trace with peak memory next to the output; "cprofile": also a cProfile dump
 
-all_files = glob.glob(os.path.join(RAW_DATA_FOLDER, FILE_PATTERN))
-df_list = []
+# Columns read_raw_file adds from the file name
+TAG_COLS = ['vehicle_type', 'year', 'month']
 
+# Filename metadata comes from one cached parse with precompiled patterns (see metadata.py)
 def detect_vehicle_type(fname):
-    fname = fname.upper()
-    if "2W" in fname:
-        return "2W"
-    elif "3W" in fname:
-        return "3W"
-    elif "4W" in fname:
-        return "4W"
-    else:
-        return "Unknown"
+    return parse_filename(fname)[0]
 
 def detect_year(fname):
-    match = re.search(r'20\d{2}', fname)
-    if match:
-        return int(match.group(0))
-    else:
-        return None
+    return parse_filename(fname)[1]
 
 # Detect month from filename (Jan, Feb, etc.)
 def detect_month(fname):
-    match = re.search(r'(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)', fname, re.IGNORECASE)
-    if match:
-        # Convert month name to number
-        month_str = match.group(0).capitalize()
-        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-        return months.index(month_str) + 1
-    else:
-        return None
+    return parse_filename(fname)[2]
 
-for file in all_files:
+# Read one raw workbook and tag it with vehicle type, year and month
+def read_raw_file(file):
+    start = time.perf_counter()
     temp_df = pd.read_excel(file)
 
     # Add vehicle type, year, and month
-    temp_df['vehicle_type'] = detect_vehicle_type(file)
-    temp_df['year'] = detect_year(file)
-    temp_df['month'] = detect_month(file)
-    df_list.append(temp_df)
+    temp_df['vehicle_type'], temp_df['year'], temp_df['month'] = parse_filename(file)
+    return temp_df, time.perf_counter() - start
+
+# Read all raw workbooks, in parallel when workers > 1; results keep the order of `files`
+def read_raw_files(files, workers=1):
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(read_raw_file, files))
+        # Reads in worker processes are recorded afterwards (their memory is not traced)
+        for file, (temp_df, seconds) in zip(files, results):
+            profiling.record(f"read {os.path.basename(file)}", seconds, rows_out=len(temp_df))
+    else:
+        results = []
+        for file in files:
+            with profiling.stage(f"read {os.path.basename(file)}") as stage:
+                results.append(read_raw_file(file))
+                stage['rows_out'] = len(results[-1][0])
+
+    for file, (temp_df, seconds) in zip(files, results):
+        print(f"⏱️ {os.path.basename(file)}: {len(temp_df)} rows in {seconds:.2f}s")
+    return [temp_df for temp_df, _ in results]
+
+# List raw workbooks in a folder, sorted so the concatenation order (and therefore S No) is reproducible
+def raw_files(folder, pattern=FILE_PATTERN):
+    return sorted(glob.glob(os.path.join(folder, pattern)))
+
+# Concatenate per-file frames in the given order and number the rows continuously
+def combine_frames(frames):
+    df = pd.concat(frames, ignore_index=True)
+
+    # === Reset S No as continuous numbers ===
+    df['S No'] = range(1, len(df) + 1)
+    return df
+
+# Record each file's header layout in the schema cache and flag files whose layout changed
+def check_layouts(files, frames, schema_cache):
+    for file, temp_df in zip(files, frames):
+        raw = temp_df.drop(columns=[col for col in TAG_COLS if col in temp_df.columns])
+        if record_file_layout(schema_cache, os.path.basename(file), raw):
+            print(f"⚠️ Layout changed: {os.path.basename(file)}")
+    print(f"🧩 {len(set(schema_cache['files'].values()))} distinct raw layout(s)")
+
+# Read and combine raw workbooks in memory: combine(paths) -> DataFrame
+def combine(paths, workers=1, schema_cache=None):
+    paths = list(paths)
+    frames = read_raw_files(paths, workers=workers)
+    if schema_cache is not None:
+        check_layouts(paths, frames, schema_cache)
+    with profiling.stage('concatenate', frames) as stage:
+        df = apply_schema(combine_frames(frames))
+        stage['rows_out'] = len(df)
+    return df
+
+# Split the previous combined frame back into per-file frames using the manifest's row counts
+def split_previous(df, manifest):
+    entries = manifest['files']
+    if sum(entry['rows'] for entry in entries.values()) != len(df):
+        return None
+    pieces, start = {}, 0
+    for name, entry in entries.items():
+        pieces[name] = df.iloc[start:start + entry['rows']][entry['columns']].reset_index(drop=True)
+        start += entry['rows']
+    return pieces
+
+if __name__ == "__main__":
+    output_path = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_registrations_combined.xlsx"
+    profiler = profiling.start('combine', PROFILE)
+    try:
+        manifest_file = manifest_path(os.path.dirname(output_path))
+        manifest = load_manifest(manifest_file)
+
+        all_files = raw_files(RAW_DATA_FOLDER)
+        hashes = {os.path.basename(file): file_hash(file) for file in all_files}
+
+        previous = None
+        if INCREMENTAL and manifest['files'] and os.path.exists(parquet_path(output_path)):
+            previous = split_previous(load_frame(output_path), manifest)
+
+        if previous is None:
+            changed_files = all_files
+            removed = []
+        else:
+            changed_files = [file for file in all_files
+                             if manifest['files'].get(os.path.basename(file), {}).get('hash') != hashes[os.path.basename(file)]]
+            removed = [name for name in manifest['files'] if name not in hashes]
+            print(f"🔎 {len(changed_files)} new/changed and {len(removed)} removed of {len(all_files)} files")
+
+        if previous is not None and not changed_files and not removed:
+            print("✅ No raw file changes, combined file is up to date")
+        else:
+            start = time.perf_counter()
+            new_frames = dict(zip(changed_files, read_raw_files(changed_files, workers=WORKERS)))
+            print(f"⏱️ Read {len(changed_files)} files with {WORKERS} worker(s) in {time.perf_counter() - start:.2f}s")
+
+            # Only new/changed files can have a new header layout
+            schema_cache_file = schema_cache_path(os.path.dirname(output_path))
+            schema_cache = load_schema_cache(schema_cache_file)
+            for name in removed:
+                schema_cache['files'].pop(name, None)
+            check_layouts(changed_files, [new_frames[file] for file in changed_files], schema_cache)
+            save_schema_cache(schema_cache_file, schema_cache)
+            df_list = [new_frames[file] if file in new_frames else previous[os.path.basename(file)] for file in all_files]
 
-# Combine all dataframes
-df = pd.concat(df_list, ignore_index=True)
+            # Combine all dataframes
+            with profiling.stage('concatenate', df_list) as stage:
+                df = compact(combine_frames(df_list), "Combined data")
+                stage['rows_out'] = len(df)
 
-# === Reset S No as continuous numbers ===
-df['S No'] = range(1, len(df) + 1)
+            print(f"✅ Combined {len(df)} rows from {len(all_files)} files.")
+            print(df[['S No', 'vehicle_type', 'year', 'month']].head(15))
 
-print(f"✅ Combined {len(df)} rows from {len(all_files)} files.")
-print(df[['S No', 'vehicle_type', 'year', 'month']].head(15))
+            # Save merged dataset
+            with profiling.stage('save', df):
+                save_frame(df, output_path, excel=EXPORT_EXCEL)
+            print(f"✅ Combined file saved at: {output_path}")
 
-# Save merged dataset
-output_path = r"C:\Users\shash\OneDrive\Desktop\free\vehicle_registrations_combined.xlsx"
-df.to_excel(output_path, index=False)
-print(f"✅ Combined file saved at: {output_path}")
\ No newline at end of file
+            # Record each file's hash and partition; queue changed partitions for clean.py/calculation.py
+            changed_partitions = [partition_key(manifest['files'][name]['vehicle_type'], manifest['files'][name]['year'])
+                                  for name in removed]
+            files = {}
+            for file, temp_df in zip(all_files, df_list):
+                name = os.path.basename(file)
+                files[name] = {
+                    'hash': hashes[name],
+                    'vehicle_type': detect_vehicle_type(file),
+                    'year': detect_year(file),
+                    'rows': len(temp_df),
+                    'columns': list(temp_df.columns),
+                }
+                if file in new_frames:
+                    changed_partitions.append(partition_key(files[name]['vehicle_type'], files[name]['year']))
+            manifest['files'] = files
+            if previous is None:
+                manifest['pending'] = {}
+            else:
+                mark_pending(manifest, changed_partitions)
+            save_manifest(manifest_file, manifest)
+    finally:
+        profiler.finish(os.path.dirname(output_path))
@@ -1,28 +1,153 @@
+import time
+started = time.perf_counter()
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
 import streamlit as st
-import pandas as pd
-import plotly.express as px
+
+import profiling
+import snapshots
+from summary import load_summary, summary_path
+
+MONTHLY_FILE = "vehicle_growth_metrics.xlsx"
+QUARTERLY_FILE = "vehicle_growth_metrics_quarterly.xlsx"
+RESULT_CACHE_MB = 256  # memory cap for per-filter results shared by all sessions
+TABLE_PAGE_SIZE = 100  # rows of the filtered table sent per page
+CHART_MAX_POINTS = 400  # trend chart points per vehicle_type (LTTB-downsampled above this)
+ROLLING_COL = 'registrations_rolling_12m'  # trailing 12-month totals from calculation.py (monthly view)
+CAGR_COL = 'CAGR_2Y_%'
+PIE_TOP_N = 10  # makers shown individually in the market-share pie; the rest roll up into "Others"
+ANOMALY_ROWS = 50  # strongest flagged values listed for the selection (see anomalies.py)
+BACKEND = "memory"  # "sqlite": push filters and aggregates down to an on-disk SQLite store shared by all sessions
+FAST_STARTUP = True  # paint filters and KPIs from the precomputed summary while the full metrics load in the background
+SNAPSHOT_ROOT = None  # folder precompute.py publishes snapshots to; None reads MONTHLY_FILE/QUARTERLY_FILE directly
+SNAPSHOT_POLL_SECONDS = 30  # how often an open page checks for a newly published snapshot
+PROFILE = None  # "trace": also trace peak memory per rerun phase and write dashboard_profile.json; "cprofile": plus a cProfile dump (single-user debugging)
 
 # ===== LOAD DATA =====
-@st.cache_data
-def load_data():
-    df_month = pd.read_excel("vehicle_growth_metrics.xlsx", sheet_name="Monthly_with_Growth")  # monthly file
-    df_quarter = pd.read_excel("vehicle_growth_metrics_quarterly.xlsx", sheet_name="Quarterly_Growth")  # quarterly file
+# The published snapshot's metrics files (see precompute.py), or the configured files without one
+def current_files():
+    published = snapshots.current(SNAPSHOT_ROOT) if SNAPSHOT_ROOT is not None else None
+    if published is None:
+        return None, (MONTHLY_FILE, QUARTERLY_FILE)
+    return published['snapshot'], snapshots.metric_files(SNAPSHOT_ROOT, published['snapshot'])
+
+# pandas/numpy and the index modules are imported on first use, so the first paint only needs streamlit
+# `version` (storage.data_version) lists the files behind the metrics and changes whenever one is rewritten
+# or a new snapshot is published, so every cache below reloads with it
+@st.cache_data(max_entries=2)
+def load_data(version):
+    from storage import load_frame
+    (monthly_file, _, _), (quarterly_file, _, _) = version
+    df_month = load_frame(monthly_file, sheet_name="Monthly_with_Growth")  # monthly file
+    df_quarter = load_frame(quarterly_file, sheet_name="Quarterly_Growth")  # quarterly file
     return df_month, df_quarter
 
-df_month, df_quarter = load_data()
+# Filter indexes and pre-aggregated cubes, built once and shared across reruns (memory backend)
+@st.cache_resource(max_entries=2)
+def load_indexes(version):
+    from filter_index import build_monthly_index, build_quarterly_index
+    df_month, df_quarter = load_data(version)
+    return build_monthly_index(df_month), build_quarterly_index(df_quarter)
+
+# SQLite backend: the store is rebuilt only when the metrics files change; sessions share it on disk.
+# Snapshot folders are immutable, so there only the store precompute.py built is used (None without one)
+@st.cache_resource(max_entries=2)
+def load_sql_indexes(version, rebuild):
+    from sql_backend import open_database, sqlite_path
+    return open_database(sqlite_path(version[0][0]), version, (lambda: load_data(version)) if rebuild else None)
+
+# Outliers flagged by calculation.py; a small table, filtered in memory on every rerun
+@st.cache_data(max_entries=2)
+def load_anomalies(version):
+    from storage import load_frame
+    (anomalies_file, _, _), = version
+    return load_frame(anomalies_file, sheet_name="Anomalies")
+
+@st.cache_resource
+def get_result_cache():
+    from result_cache import ResultCache
+    return ResultCache(max_bytes=RESULT_CACHE_MB * 1024 ** 2)
+
+@st.cache_resource
+def get_loader():
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="dashboard-loader")
+
+def load_detail(files, rebuild_sqlite):
+    """Full metrics, filter indexes and result cache, with the seconds each step took"""
+    timings = {}
+    start = time.perf_counter()
+    from storage import data_version
+    timings['import pandas/pyarrow'] = time.perf_counter() - start
+
+    version = data_version(files)
+    start = time.perf_counter()
+    indexes = load_sql_indexes(version, rebuild_sqlite) if BACKEND == "sqlite" else None
+    if indexes is not None:
+        month_index, quarter_index = indexes
+        timings['open SQLite store'] = time.perf_counter() - start
+    else:
+        # Memory backend, or a snapshot published without a SQLite store (precompute.py --no-sqlite)
+        load_data(version)
+        timings['load metrics'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        month_index, quarter_index = load_indexes(version)
+        timings['build indexes'] = time.perf_counter() - start
+    return {'version': version, 'month_index': month_index, 'quarter_index': quarter_index,
+            'result_cache': get_result_cache(), 'timings': timings}
+
+def wait_for_detail():
+    start = time.perf_counter()
+    result = detail.result()
+    startup_times['wait for detail'] = time.perf_counter() - start
+    return result
+
+startup_times = {'import streamlit': time.perf_counter() - started}
+
+# Rerun phases (filter, KPIs, each chart) are timed as laps and listed in the debug panel
+profiler = profiling.start('dashboard', PROFILE)
+lap = profiler.laps()
+
+# Start loading the full metrics right away; with FAST_STARTUP the summary is painted meanwhile
+snapshot, metric_files = current_files()
+detail = get_loader().submit(load_detail, metric_files, snapshot is None)
+
+start = time.perf_counter()
+summary = load_summary(summary_path(metric_files[0])) if FAST_STARTUP else None
+startup_times['load summary'] = time.perf_counter() - start
+
+if summary is None:
+    # No (fresh) summary: derive the same options from the full metrics
+    from summary import build_summary
+    loaded = wait_for_detail()
+    summary = build_summary(*load_data(loaded['version']), loaded['version'])
+lap('load summary')
+
+# ===== SNAPSHOT HOT-SWAP =====
+# A newly published snapshot reruns the page with its files; the caches load it, the filters are kept
+if SNAPSHOT_ROOT is not None:
+    @st.fragment(run_every=SNAPSHOT_POLL_SECONDS)
+    def watch_snapshot():
+        if current_files()[0] != snapshot:
+            st.rerun()
+
+    with st.sidebar:
+        watch_snapshot()
+    st.sidebar.caption(f"Snapshot: {snapshot or 'none published, reading ' + MONTHLY_FILE}")
 
 # ===== SIDEBAR FILTERS =====
 st.sidebar.header("Filters")
 view_type = st.sidebar.radio("Select view", ["Monthly", "Quarterly"])
-vehicle_types = st.sidebar.multiselect("Vehicle Type", options=df_month['vehicle_type'].unique(), default=df_month['vehicle_type'].unique())
-manufacturers = st.sidebar.multiselect("Manufacturer", options=df_month['Maker'].unique(), default=df_month['Maker'].unique())
+vehicle_types = st.sidebar.multiselect("Vehicle Type", options=summary['vehicle_types'], default=summary['vehicle_types'])
+manufacturers = st.sidebar.multiselect("Manufacturer", options=summary['makers'], default=summary['makers'])
 
 if view_type == "Monthly":
-    # Convert pandas Timestamp to Python datetime
-    min_date = df_month['date'].min().to_pydatetime().date()
-    max_date = df_month['date'].max().to_pydatetime().date()
+    min_date = date.fromisoformat(summary['min_date'])
+    max_date = date.fromisoformat(summary['max_date'])
     date_range = st.sidebar.date_input(
-        "Date Range", 
+        "Date Range",
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date
@@ -32,81 +157,181 @@ if view_type == "Monthly":
         start_date, end_date = date_range
     else:
         start_date = end_date = date_range
+    full_range = (start_date, end_date) == (min_date, max_date)
 else:
-    min_year, max_year = int(df_quarter['year'].min()), int(df_quarter['year'].max())
+    min_year, max_year = summary['min_year'], summary['max_year']
     year_range = st.sidebar.slider("Year Range", min_year, max_year, (min_year, max_year))
+    full_range = tuple(year_range) == (min_year, max_year)
+lap('sidebar filters')
+
+# ===== KPI METRICS =====
+def show_kpis(totals):
+    total_regs = totals['registrations']
+    avg_yoy = totals.get('YoY_growth_%')
+    avg_qoq = totals.get('QoQ_growth_%')
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Total Registrations", f"{total_regs:,.0f}")
+    if avg_yoy is not None:
+        col2.metric("Avg YoY Growth %", f"{avg_yoy:.2f}%")
+    if avg_qoq is not None:
+        col3.metric("Avg QoQ Growth %", f"{avg_qoq:.2f}%")
+
+# The default (everything selected) KPIs are in the summary, so they render before the detail is loaded
+default_selection = (full_range and set(vehicle_types) == set(summary['vehicle_types'])
+                     and set(manufacturers) == set(summary['makers']))
+if default_selection:
+    show_kpis({col: (float('nan') if value is None else value)
+               for col, value in summary['totals'][view_type].items()})
+    startup_times['first KPI paint'] = time.perf_counter() - started
+    lap('KPIs (summary)')
 
 # ===== FILTER DATA =====
+loaded = wait_for_detail()
+import pandas as pd  # already imported by the loader
+lap('wait for detail')
+
 if view_type == "Monthly":
+    index = loaded['month_index']
     # Convert date_range back to pandas datetime for filtering
     start_date_pd = pd.to_datetime(start_date)
     end_date_pd = pd.to_datetime(end_date)
-    
-    df_filtered = df_month[
-        (df_month['vehicle_type'].isin(vehicle_types)) &
-        (df_month['Maker'].isin(manufacturers)) &
-        (df_month['date'] >= start_date_pd) &
-        (df_month['date'] <= end_date_pd)
-    ]
+    first, last = index.period_range(start_date_pd.to_datetime64(), end_date_pd.to_datetime64())
 else:
-    df_filtered = df_quarter[
-        (df_quarter['vehicle_type'].isin(vehicle_types)) &
-        (df_quarter['Maker'].isin(manufacturers)) &
-        (df_quarter['year'].between(year_range[0], year_range[1]))
-    ]
+    index = loaded['quarter_index']
+    first, last = index.period_range(year_range[0], year_range[1])
 
-# ===== KPI METRICS =====
-total_regs = df_filtered['registrations'].sum()
-avg_yoy = df_filtered['YoY_growth_%'].replace("N/A", None).astype(float).mean() if 'YoY_growth_%' in df_filtered.columns else None
-avg_qoq = df_filtered['QoQ_growth_%'].replace("N/A", None).astype(float).mean() if 'QoQ_growth_%' in df_filtered.columns else None
+vt_mask, maker_mask = index.masks(vehicle_types, manufacturers)
+
+# Filtered rows, KPIs and chart inputs are memoized per normalized filter selection
+def compute_results():
+    return {
+        'rows': index.filtered_rows(vt_mask, maker_mask, first, last),
+        'totals': index.totals(vt_mask, maker_mask, first, last),
+        'trend': index.trend(vt_mask, maker_mask, first, last),
+        'by_maker': index.by_maker(vt_mask, maker_mask, first, last),
+        'rolling_trend': (index.trend(vt_mask, maker_mask, first, last, ROLLING_COL)
+                          if ROLLING_COL in index.sum_cols else None),
+    }
+
+from chart_data import downsample, page, page_count, top_n_share
+from result_cache import filter_key
+from schema import with_year_quarter
+result_cache = loaded['result_cache']
+results = result_cache.get_or_compute(loaded['version'], filter_key(view_type, vt_mask, maker_mask, first, last),
+                                      compute_results)
+df_filtered = results['rows']
+lap('filter', df_filtered)
+
+cache_stats = result_cache.stats()
+st.sidebar.caption(f"Result cache: {cache_stats['entries']} entries, {cache_stats['bytes'] / 1024 ** 2:.1f} MB, "
+                   f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
-col1, col2, col3 = st.columns(3)
-col1.metric("Total Registrations", f"{total_regs:,.0f}")
-if avg_yoy is not None:
-    col2.metric("Avg YoY Growth %", f"{avg_yoy:.2f}%")
-if avg_qoq is not None:
-    col3.metric("Avg QoQ Growth %", f"{avg_qoq:.2f}%")
+if not default_selection:
+    show_kpis(results['totals'])
+    lap('KPIs')
 
 # ===== CHARTS =====
+start = time.perf_counter()
+import plotly.express as px
+startup_times['import plotly'] = time.perf_counter() - start
+lap('import plotly')
+
 st.subheader(f"{view_type} Trends")
 
-if view_type == "Monthly":
-    fig1 = px.line(df_filtered, x="date", y="registrations", color="vehicle_type", title="Registrations Over Time")
-else:
-    fig1 = px.line(df_filtered, x="year_quarter", y="registrations", color="vehicle_type", title="Registrations Over Time")
+x_col = "date" if view_type == "Monthly" else "year_quarter"
+trend_df = downsample(results['trend'], 'vehicle_type', 'registrations', CHART_MAX_POINTS).rename(columns={'period': x_col})
+fig1 = px.line(trend_df, x=x_col, y="registrations", color="vehicle_type", title="Registrations Over Time")
 st.plotly_chart(fig1, use_container_width=True)
+lap('trend chart', trend_df, rows_in=results['trend'])
+
+# Rolling 12-month totals smooth out seasonality (monthly view only)
+if results['rolling_trend'] is not None:
+    rolling_df = downsample(results['rolling_trend'], 'vehicle_type', ROLLING_COL, CHART_MAX_POINTS).rename(columns={'period': x_col})
+    if not rolling_df.empty:
+        fig_rolling = px.line(rolling_df, x=x_col, y=ROLLING_COL, color="vehicle_type", title="Rolling 12-Month Registrations")
+        st.plotly_chart(fig_rolling, use_container_width=True)
+    lap('rolling chart', rolling_df, rows_in=results['rolling_trend'])
+
+maker_df = results['by_maker']
 
 # YoY Chart (if available)
-if 'YoY_growth_%' in df_filtered.columns:
-    # Filter out non-numeric values before grouping
-    yoy_numeric = df_filtered[df_filtered['YoY_growth_%'] != "N/A"].copy()
-    if not yoy_numeric.empty:
-        yoy_numeric['YoY_growth_%'] = pd.to_numeric(yoy_numeric['YoY_growth_%'], errors='coerce')
-        yoy_df = yoy_numeric.groupby("Maker")['YoY_growth_%'].mean().reset_index()
-        yoy_df = yoy_df.dropna()  # Remove any NaN values
-        if not yoy_df.empty:
-            fig2 = px.bar(yoy_df.sort_values("YoY_growth_%", ascending=False).head(15), 
-                         x="Maker", y="YoY_growth_%", title="Top 15 Manufacturers by Avg YoY Growth %")
-            st.plotly_chart(fig2, use_container_width=True)
+if 'YoY_growth_%' in maker_df.columns:
+    yoy_df = maker_df[['Maker', 'YoY_growth_%']].dropna()  # Remove any NaN values
+    if not yoy_df.empty:
+        fig2 = px.bar(yoy_df.sort_values("YoY_growth_%", ascending=False).head(15),
+                     x="Maker", y="YoY_growth_%", title="Top 15 Manufacturers by Avg YoY Growth %")
+        st.plotly_chart(fig2, use_container_width=True)
+    lap('YoY chart', yoy_df, rows_in=maker_df)
 
 # QoQ Chart (if available)
-if 'QoQ_growth_%' in df_filtered.columns:
-    # Filter out non-numeric values before grouping
-    qoq_numeric = df_filtered[df_filtered['QoQ_growth_%'] != "N/A"].copy()
-    if not qoq_numeric.empty:
-        qoq_numeric['QoQ_growth_%'] = pd.to_numeric(qoq_numeric['QoQ_growth_%'], errors='coerce')
-        qoq_df = qoq_numeric.groupby("Maker")['QoQ_growth_%'].mean().reset_index()
-        qoq_df = qoq_df.dropna()  # Remove any NaN values
-        if not qoq_df.empty:
-            fig3 = px.bar(qoq_df.sort_values("QoQ_growth_%", ascending=False).head(15), 
-                         x="Maker", y="QoQ_growth_%", title="Top 15 Manufacturers by Avg QoQ Growth %")
-            st.plotly_chart(fig3, use_container_width=True)
+if 'QoQ_growth_%' in maker_df.columns:
+    qoq_df = maker_df[['Maker', 'QoQ_growth_%']].dropna()  # Remove any NaN values
+    if not qoq_df.empty:
+        fig3 = px.bar(qoq_df.sort_values("QoQ_growth_%", ascending=False).head(15),
+                     x="Maker", y="QoQ_growth_%", title="Top 15 Manufacturers by Avg QoQ Growth %")
+        st.plotly_chart(fig3, use_container_width=True)
+    lap('QoQ chart', qoq_df, rows_in=maker_df)
+
+# CAGR Chart (if available)
+if CAGR_COL in maker_df.columns:
+    cagr_df = maker_df[['Maker', CAGR_COL]].dropna()
+    if not cagr_df.empty:
+        fig_cagr = px.bar(cagr_df.sort_values(CAGR_COL, ascending=False).head(15),
+                          x="Maker", y=CAGR_COL, title="Top 15 Manufacturers by Avg 2-Year CAGR %")
+        st.plotly_chart(fig_cagr, use_container_width=True)
+    lap('CAGR chart', cagr_df, rows_in=maker_df)
 
 # ===== MARKET SHARE =====
-market_share = df_filtered.groupby("Maker")['registrations'].sum().reset_index()
-fig4 = px.pie(market_share, values='registrations', names='Maker', title='Market Share by Registrations')
+market_share = top_n_share(maker_df, 'Maker', 'registrations', PIE_TOP_N)
+fig4 = px.pie(market_share, values='registrations', names='Maker', title=f'Market Share by Registrations (Top {PIE_TOP_N})')
 st.plotly_chart(fig4, use_container_width=True)
+lap('market share pie', market_share, rows_in=maker_df)
+
+# ===== ANOMALIES =====
+from anomalies import anomalies_path, Z_THRESHOLD
+from storage import data_version, source_file
+anomalies_file = anomalies_path(metric_files[0])
+if os.path.exists(source_file(anomalies_file)):
+    anomalies = load_anomalies(data_version([anomalies_file]))
+    selected = anomalies[(anomalies['view'] == view_type).to_numpy()
+                         & anomalies['vehicle_type'].astype(str).isin(vehicle_types).to_numpy()
+                         & anomalies['Maker'].astype(str).isin(manufacturers).to_numpy()]
+    if view_type == "Monthly":
+        selected = selected[selected['date'].between(start_date_pd, end_date_pd)]
+    else:
+        selected = selected[selected['year'].between(year_range[0], year_range[1])]
+    st.subheader("Anomalies")
+    st.dataframe(selected.drop(columns='view').head(ANOMALY_ROWS), hide_index=True)
+    st.caption(f"{len(selected):,} values in the selection lie {Z_THRESHOLD}+ robust z-scores from their series' "
+               f"trailing median (strongest {min(ANOMALY_ROWS, len(selected))} shown)")
+    lap('anomalies', selected, rows_in=anomalies)
 
 # ===== DATA TABLE =====
 st.subheader("Filtered Data")
-st.dataframe(df_filtered)
\ No newline at end of file
+# Sorted and paginated on the server: only one page of rows goes to the browser
+sort_col1, sort_col2, page_col = st.columns(3)
+sort_by = sort_col1.selectbox("Sort by", ["(none)"] + list(df_filtered.columns))
+ascending = sort_col2.radio("Order", ["Ascending", "Descending"], horizontal=True) == "Ascending"
+n_pages = page_count(len(df_filtered), TABLE_PAGE_SIZE)
+page_number = page_col.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+page_df = page(df_filtered, int(page_number), TABLE_PAGE_SIZE, None if sort_by == "(none)" else sort_by, ascending)
+st.dataframe(with_year_quarter(page_df))
+first_row = (int(page_number) - 1) * TABLE_PAGE_SIZE
+st.caption(f"Rows {min(first_row + 1, len(df_filtered))}-{min(first_row + TABLE_PAGE_SIZE, len(df_filtered))} "
+           f"of {len(df_filtered):,} (page {int(page_number)} of {n_pages})")
+lap('table page', page_df, rows_in=df_filtered)
+
+# ===== DEBUG PANEL =====
+startup_times.update(loaded['timings'])
+startup_times['total'] = time.perf_counter() - started
+phases = profiler.finish(os.path.dirname(MONTHLY_FILE) or '.', report=False)
+with st.sidebar.expander("Debug: timing and profiling"):
+    st.caption("Startup")
+    for step, seconds in startup_times.items():
+        st.text(f"{step:<22} {seconds * 1000:8.1f} ms")
+    st.caption("Rerun phases (ms, rows in → out" + (", peak MB)" if profiler.memory else ")"))
+    for phase in phases:
+        rows = f"{phase['rows_in'] if phase['rows_in'] is not None else '-'} → {phase['rows_out'] if phase['rows_out'] is not None else '-'}"
+        peak = f" {phase['peak_mb']:7.1f}" if phase['peak_mb'] is not None else ""
+        st.text(f"{phase['stage']:<18} {phase['seconds'] * 1000:8.1f}  {rows}{peak}")
@@ -0,0 +1,91 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl import Workbook
+
+from atomic import replacing
+from schema import derives_year_quarter, with_year_quarter
+
+# Rows converted to Python values at a time; only one chunk per sheet is held beyond the frame itself
+CHUNK_ROWS = 20_000
+
+# Rows per Excel sheet including the header; longer outputs continue on <sheet>_2, <sheet>_3, ...
+SHEET_MAX_ROWS = 1_048_576
+
+
+def sheet_rows(df, chunk_rows=CHUNK_ROWS):
+    """Header, then df's rows as lists of cell values (NaN as empty cells), built chunk by chunk"""
+    # year_quarter labels are derived per chunk instead of on a full copy of df
+    labelled = derives_year_quarter(df)
+    yield [str(col) for col in (with_year_quarter(df.iloc[:0]) if labelled else df).columns]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        chunk = (with_year_quarter(chunk) if labelled else chunk).astype(object)
+        yield from chunk.where(chunk.notnull(), None).itertuples(index=False, name=None)
+
+
+def write_workbook(path, sheets, chunk_rows=CHUNK_ROWS):
+    """Stream {sheet name: frame} into one .xlsx with a write-only workbook, then swap it in
+
+    Appended rows are serialized to the sheet's XML on disk right away (openpyxl write-only mode),
+    so memory stays flat however long the frames are.
+    """
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in sheets.items():
+        rows = sheet_rows(df, chunk_rows)
+        header = next(rows)
+        part, sheet, written = 1, None, SHEET_MAX_ROWS
+        for row in rows:
+            if written == SHEET_MAX_ROWS:
+                sheet = workbook.create_sheet(sheet_name if part == 1 else f"{sheet_name}_{part}")
+                sheet.append(header)
+                part, written = part + 1, 1
+            sheet.append(row)
+            written += 1
+        if sheet is None:
+            workbook.create_sheet(sheet_name).append(header)
+    with replacing(path) as tmp_path:
+        workbook.save(tmp_path)
+    print(f"📄 Excel export: {path}")
+    return path
+
+
+def split_path(path, value):
+    """Per-value file next to `path`: vehicle_growth_metrics.xlsx -> vehicle_growth_metrics_2W.xlsx"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{value}{ext}"
+
+
+def split_workbooks(path, sheets, split_col):
+    """One {path: sheets} entry per value of split_col; sheets without that column go to every file"""
+    values = sorted({str(value) for df in sheets.values() if split_col in df.columns
+                     for value in df[split_col].dropna().unique()})
+    workbooks = {}
+    for value in values:
+        workbooks[split_path(path, value)] = {
+            sheet_name: (df[df[split_col].astype(str) == value] if split_col in df.columns else df)
+            for sheet_name, df in sheets.items()
+        }
+    return workbooks
+
+
+def export_workbooks(workbooks, workers=4, chunk_rows=CHUNK_ROWS):
+    """Write {path: {sheet name: frame}} workbooks in parallel, one worker process per file
+
+    openpyxl is pure Python and holds the GIL, so threads would take turns; each process gets a
+    pickled copy of its file's frames instead.
+    """
+    if workers <= 1 or len(workbooks) <= 1:
+        return [write_workbook(path, sheets, chunk_rows) for path, sheets in workbooks.items()]
+    with ProcessPoolExecutor(max_workers=min(workers, len(workbooks))) as pool:
+        futures = [pool.submit(write_workbook, path, sheets, chunk_rows) for path, sheets in workbooks.items()]
+        return [future.result() for future in futures]
+
+
+def flat_frame(df):
+    """Index as columns and MultiIndex columns joined with '_' (aggregated insight tables)"""
+    out = df.reset_index()
+    if isinstance(out.columns, pd.MultiIndex):
+        out.columns = ['_'.join(str(level) for level in col if str(level)) for col in out.columns]
+    return out
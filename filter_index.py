@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from growth import period_index
+from schema import year_quarter
+
+# Growth columns averaged per filter selection (sum and non-null count are pre-aggregated)
+MEAN_COLS = ['YoY_growth_%', 'QoQ_growth_%', 'CAGR_2Y_%', 'CAGR_3Y_%']
+
+# Additive columns summed per filter selection besides registrations (rolling totals add up across groups)
+SUM_COLS = ['registrations_rolling_12m']
+
+
+class FilterIndex:
+    """Integer-coded, period-sorted index over a metrics frame with (Maker × vehicle_type × period) cubes
+
+    Built once at load time. Filters become boolean lookups over the category codes plus a
+    contiguous slice of period buckets, and KPIs / chart inputs are sums over cube slices.
+    """
+
+    def __init__(self, df, period_key, range_key, period_label):
+        # period_key: sortable per-row period id; range_key: per-row value the range filter compares
+        # (monotonic in period_key); period_label: per-row x-axis label for charts
+        self.makers, maker_codes = _codes(df['Maker'])
+        self.vehicle_types, vt_codes = _codes(df['vehicle_type'])
+
+        # Rows without a Maker or vehicle_type can never be selected
+        keep = np.flatnonzero((maker_codes >= 0) & (vt_codes >= 0))
+        periods, period_codes = np.unique(np.asarray(period_key)[keep], return_inverse=True)
+        order = np.lexsort((maker_codes[keep], vt_codes[keep], period_codes))
+        self.rows = df.iloc[keep[order]].reset_index(drop=True)
+        self.maker_codes = maker_codes[keep][order]
+        self.vt_codes = vt_codes[keep][order]
+        self.period_codes = period_codes[order]
+
+        # Row offsets of each period bucket in the sorted rows
+        n_periods = len(periods)
+        self.bucket_offsets = np.searchsorted(self.period_codes, np.arange(n_periods + 1))
+        first_rows = keep[order][self.bucket_offsets[:-1]]
+        self.period_ranges = np.asarray(range_key)[first_rows]
+        self.period_labels = np.asarray(period_label)[first_rows]
+
+        # Pre-aggregated cubes, shape (maker, vehicle_type, period)
+        shape = (len(self.makers), len(self.vehicle_types), n_periods)
+        flat = np.ravel_multi_index((self.maker_codes, self.vt_codes, self.period_codes), shape)
+        size = int(np.prod(shape))
+
+        def cube(weights=None):
+            return np.bincount(flat, weights=weights, minlength=size).reshape(shape)
+
+        self.cubes = {
+            'rows': cube(),
+            'registrations': cube(pd.to_numeric(self.rows['registrations'], errors='coerce').fillna(0).to_numpy('float64')),
+        }
+        self.sum_cols = [col for col in SUM_COLS if col in df.columns]
+        for col in self.sum_cols:
+            values = pd.to_numeric(self.rows[col], errors='coerce').to_numpy('float64')
+            present = ~np.isnan(values)
+            self.cubes[col] = cube(np.where(present, values, 0.0))
+            self.cubes[col + ':count'] = cube(present.astype('float64'))
+        self.mean_cols = [col for col in MEAN_COLS if col in df.columns]
+        for col in self.mean_cols:
+            values = pd.to_numeric(self.rows[col], errors='coerce').to_numpy('float64')
+            present = ~np.isnan(values)
+            self.cubes[col + ':sum'] = cube(np.where(present, values, 0.0))
+            self.cubes[col + ':count'] = cube(present.astype('float64'))
+
+    def period_range(self, start, end):
+        """[first, last) period bucket numbers whose range value lies within start..end"""
+        return (int(np.searchsorted(self.period_ranges, start, side='left')),
+                int(np.searchsorted(self.period_ranges, end, side='right')))
+
+    def masks(self, vehicle_types, makers):
+        """Boolean lookup arrays over vehicle_type and Maker codes for a selection"""
+        return np.isin(self.vehicle_types, list(vehicle_types)), np.isin(self.makers, list(makers))
+
+    def filtered_rows(self, vt_mask, maker_mask, first, last):
+        """Rows of the selection: a slice of period buckets narrowed by the code lookups"""
+        start, stop = self.bucket_offsets[first], self.bucket_offsets[max(first, last)]
+        keep = vt_mask[self.vt_codes[start:stop]] & maker_mask[self.maker_codes[start:stop]]
+        return self.rows.iloc[start:stop][keep]
+
+    def _slice(self, name, vt_mask, maker_mask, first, last):
+        return self.cubes[name][:, :, first:last][maker_mask][:, vt_mask]
+
+    def totals(self, vt_mask, maker_mask, first, last):
+        """Total registrations and the row-weighted mean of each growth column"""
+        result = {'registrations': self._slice('registrations', vt_mask, maker_mask, first, last).sum()}
+        for col in self.mean_cols:
+            total = self._slice(col + ':sum', vt_mask, maker_mask, first, last).sum()
+            count = self._slice(col + ':count', vt_mask, maker_mask, first, last).sum()
+            result[col] = total / count if count else np.nan
+        return result
+
+    def trend(self, vt_mask, maker_mask, first, last, value_col='registrations'):
+        """Registrations (or another summed column) per (vehicle_type, period) over the selection"""
+        regs = self._slice(value_col, vt_mask, maker_mask, first, last).sum(axis=0)
+        # Points only where some row has a value (rolling totals are missing before a full window)
+        count_name = value_col + ':count' if value_col + ':count' in self.cubes else 'rows'
+        rows = self._slice(count_name, vt_mask, maker_mask, first, last).sum(axis=0)
+        vt_idx, period_idx = np.nonzero(rows)
+        return pd.DataFrame({
+            'vehicle_type': self.vehicle_types[vt_mask][vt_idx],
+            'period': self.period_labels[first:last][period_idx],
+            value_col: regs[vt_idx, period_idx],
+        }).sort_values(['period', 'vehicle_type'], kind='mergesort').reset_index(drop=True)
+
+    def by_maker(self, vt_mask, maker_mask, first, last):
+        """Per-Maker registrations and mean growth over the selection (Makers with rows only)"""
+        rows = self._slice('rows', vt_mask, maker_mask, first, last).sum(axis=(1, 2))
+        present = rows > 0
+        out = pd.DataFrame({
+            'Maker': self.makers[maker_mask][present],
+            'registrations': self._slice('registrations', vt_mask, maker_mask, first, last).sum(axis=(1, 2))[present],
+        })
+        for col in self.mean_cols:
+            total = self._slice(col + ':sum', vt_mask, maker_mask, first, last).sum(axis=(1, 2))[present]
+            count = self._slice(col + ':count', vt_mask, maker_mask, first, last).sum(axis=(1, 2))[present]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                out[col] = np.where(count > 0, total / count, np.nan)
+        return out
+
+
+def _codes(values):
+    """Sorted category labels and per-row integer codes (-1 for missing)"""
+    codes, labels = pd.factorize(pd.Series(values).astype(object), sort=True)
+    return np.asarray(labels, dtype=object), codes
+
+
+def build_monthly_index(df_month):
+    """FilterIndex over monthly metrics, bucketed by date"""
+    dates = pd.to_datetime(df_month['date'])
+    return FilterIndex(df_month, dates.to_numpy(), dates.to_numpy(), dates.to_numpy())
+
+
+def build_quarterly_index(df_quarter):
+    """FilterIndex over quarterly metrics, bucketed by (year, quarter) and range-filtered by year"""
+    return FilterIndex(df_quarter, period_index(df_quarter, 'quarter'), df_quarter['year'].astype('int64').to_numpy(),
+                       year_quarter(df_quarter).to_numpy())
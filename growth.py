@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Number of periods in a year for each period column
+PERIODS_PER_YEAR = {'month': 12, 'quarter': 4}
+
+# Common lags, expressed in periods of the series they apply to
+MOM_LAG = 1
+QOQ_LAG = 1
+YOY_MONTHLY_LAG = 12
+YOY_QUARTERLY_LAG = 4
+
+
+def period_index(df, period_col):
+    """Encode (year, month) or (year, quarter) as one running integer period number"""
+    periods_per_year = PERIODS_PER_YEAR[period_col]
+    return df['year'].astype('int64').to_numpy() * periods_per_year + (df[period_col].astype('int64').to_numpy() - 1)
+
+
+def quarter_of_month(month):
+    """Quarter number (1-4) of month numbers (1-12)"""
+    return (month - 1) // 3 + 1
+
+
+def shared_group_ids(left, right, group_cols):
+    """One integer id per group key, consistent across two frames (-1 where a key is missing)"""
+    left_ids = np.zeros(len(left), dtype='int64')
+    right_ids = np.zeros(len(right), dtype='int64')
+    for col in group_cols:
+        codes, uniques = pd.factorize(pd.concat([left[col], right[col]], ignore_index=True))
+        missing = codes < 0
+        left_ids = np.where(missing[:len(left)] | (left_ids < 0), -1, left_ids * len(uniques) + codes[:len(left)])
+        right_ids = np.where(missing[len(left):] | (right_ids < 0), -1, right_ids * len(uniques) + codes[len(left):])
+    return left_ids, right_ids
+
+
+def join_period_values(left, right, group_cols, period_col, value_cols):
+    """Columns of `right` (one row per group and period) looked up for each row of `left`
+
+    Rows match on group and on the (year, period_col) period id, via one sorted integer key
+    per row; like a left merge, unmatched rows get NaN. Returns {column: values aligned with left}.
+    """
+    out = {col: np.full(len(left), np.nan) for col in value_cols}
+    if left.empty or right.empty:
+        return out
+    left_groups, right_groups = shared_group_ids(left, right, group_cols)
+    left_periods, right_periods = period_index(left, period_col), period_index(right, period_col)
+    base = min(left_periods.min(), right_periods.min())
+    span = max(left_periods.max(), right_periods.max()) - base + 1
+    left_keys = left_groups * span + (left_periods - base)
+    right_keys = right_groups * span + (right_periods - base)
+
+    order = np.argsort(right_keys, kind='stable')
+    sorted_keys = right_keys[order]
+    pos = np.minimum(np.searchsorted(sorted_keys, left_keys), len(sorted_keys) - 1)
+    found = (left_groups >= 0) & (sorted_keys[pos] == left_keys)
+    rows = order[pos]
+    for col in value_cols:
+        out[col] = np.where(found, right[col].to_numpy(dtype='float64')[rows], np.nan)
+    return out
+
+
+def add_growth(df, group_cols, period_col, lag, prev_col, growth_col, value_col='registrations'):
+    """Add the value `lag` periods earlier and the % growth against it, for all groups in one pass"""
+    # Rows with a missing group key never formed a group in the old per-group loop
+    out = df.dropna(subset=group_cols)
+    out = out.sort_values(group_cols + ['year', period_col], kind='mergesort').reset_index(drop=True)
+
+    if out.empty:
+        out[prev_col] = np.nan
+        out[growth_col] = np.nan
+        return out
+
+    # One sorted integer key per row: group id * span + period offset
+    periods = period_index(out, period_col)
+    offsets = periods - periods.min()
+    span = offsets.max() + 1
+    group_ids = out.groupby(group_cols, sort=True, observed=True).ngroup().to_numpy().astype('int64')
+    keys = group_ids * span + offsets
+
+    # Shifted lookup: the prior period of the same group lives at key - lag
+    target = keys - lag
+    in_range = (offsets - lag >= 0) & (offsets - lag < span)
+    pos = np.minimum(np.searchsorted(keys, target, side='left'), len(keys) - 1)
+    found = in_range & (keys[pos] == target)
+
+    values = out[value_col].to_numpy(dtype='float64')
+    prev = np.where(found, values[pos], np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = ((values - prev) / prev) * 100
+    # Using absolute values to remove negative signs
+    growth = np.where(prev > 0, np.round(np.abs(growth), 2), np.nan)
+
+    out[prev_col] = prev
+    out[growth_col] = growth
+    return out
+
+
+def add_lag_growth(df, period_col, lag, label='lag', prev_col=None, growth_col=None, value_col='registrations'):
+    """Add prior-period value and % growth per vehicle_type/Maker for any lag
+
+    e.g. MoM: ('month', 1, 'MoM'), YoY: ('month', 12, 'YoY'), QoQ: ('quarter', 1, 'QoQ').
+    Column names default to `<value>_lag_<label>` and `<label>_growth_%`.
+    """
+    group_cols = ['vehicle_type', 'Maker']
+    if 'vehicle_category' in df.columns:
+        group_cols.insert(1, 'vehicle_category')
+    return add_growth(df, group_cols, period_col, lag,
+                      prev_col=prev_col or f'{value_col}_lag_{label}',
+                      growth_col=growth_col or f'{label}_growth_%',
+                      value_col=value_col)
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from growth import period_index, PERIODS_PER_YEAR
+from atomic import write_json
+
+# Manifest of raw file hashes and pending partitions, kept next to the pipeline outputs
+MANIFEST_NAME = 'pipeline_manifest.json'
+
+# Stages downstream of combine.py that reprocess only pending partitions
+STAGES = ['clean', 'calculation']
+
+
+def manifest_path(folder):
+    """Manifest file for a pipeline output folder"""
+    return os.path.join(folder, MANIFEST_NAME)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(path):
+    """Load the manifest; without one every stage is due for a full rebuild"""
+    if not os.path.exists(path):
+        return {'files': {}, 'pending': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(path, manifest):
+    """Write the manifest atomically so a crashed run never leaves it half-written"""
+    write_json(path, manifest)
+
+
+def partition_key(vehicle_type, year):
+    """(vehicle_type, year) partition key; year is None when it could not be detected"""
+    return (str(vehicle_type), None if year is None or pd.isna(year) else int(year))
+
+
+def _sorted_partitions(partitions):
+    return sorted(set(partitions), key=lambda p: (p[0], -1 if p[1] is None else p[1]))
+
+
+def mark_pending(manifest, partitions):
+    """Queue partitions for every stage that is not already due for a full rebuild"""
+    pending = manifest.setdefault('pending', {})
+    for stage in STAGES:
+        if stage in pending:
+            queued = [partition_key(*p) for p in pending[stage]]
+            pending[stage] = [list(p) for p in _sorted_partitions(queued + list(partitions))]
+
+
+def pending_partitions(manifest, stage):
+    """Partitions `stage` still has to reprocess, or None when it needs a full rebuild"""
+    partitions = manifest.get('pending', {}).get(stage)
+    if partitions is None:
+        return None
+    return [partition_key(*p) for p in partitions]
+
+
+def mark_done(manifest, stage):
+    """Record that `stage` is up to date with the combined data"""
+    manifest.setdefault('pending', {})[stage] = []
+
+
+def partition_groups(df):
+    """{partition key: row positions}, in order of first appearance"""
+    keys = pd.DataFrame({
+        'vehicle_type': df['vehicle_type'].astype(str).to_numpy(),
+        'year': pd.to_numeric(df['year'], errors='coerce').to_numpy(),
+    })
+    groups = keys.groupby(['vehicle_type', 'year'], sort=False, dropna=False).indices
+    ordered = sorted(groups.items(), key=lambda item: item[1][0])
+    return {partition_key(vehicle_type, year): pos for (vehicle_type, year), pos in ordered}
+
+
+def partition_mask(df, partitions):
+    """Boolean mask of the rows belonging to `partitions`"""
+    wanted = set(partitions)
+    mask = pd.Series(False, index=df.index)
+    for key, pos in partition_groups(df).items():
+        if key in wanted:
+            mask.iloc[pos] = True
+    return mask
+
+
+def splice_partitions(new, previous, partitions, order):
+    """Rows of `partitions` from `new` and of every other partition from `previous`, in `order`"""
+    changed = set(partitions)
+    new_groups, previous_groups = partition_groups(new), partition_groups(previous)
+    pieces = []
+    for key in order:
+        frame, groups = (new, new_groups) if key in changed else (previous, previous_groups)
+        if key in groups:
+            pieces.append(frame.iloc[groups[key]])
+    if not pieces:
+        return new.iloc[:0]
+    return pd.concat(pieces, ignore_index=True)
+
+
+def source_mask(df, partitions):
+    """Rows that can feed the growth metrics of `partitions`: same vehicle_type, one year either side"""
+    years = pd.to_numeric(df['year'], errors='coerce')
+    vehicle_types = df['vehicle_type'].astype(str)
+    mask = pd.Series(False, index=df.index)
+    for vehicle_type, year in partitions:
+        if year is not None:
+            mask |= (vehicle_types == vehicle_type) & years.between(year - 1, year + 1)
+    return mask
+
+
+def affected_periods(partitions, period_col):
+    """(vehicle_type, period id) pairs whose growth metrics a change to `partitions` can alter
+
+    Monthly rows: the changed months, the same months a year later (YoY) and the months of the
+    following quarter (QoQ is joined onto monthly rows). Quarterly rows: the changed quarters
+    and the following quarter.
+    """
+    periods_per_year = PERIODS_PER_YEAR[period_col]
+    affected = set()
+    for vehicle_type, year in partitions:
+        if year is None:
+            continue
+        for period in range(year * periods_per_year, (year + 1) * periods_per_year):
+            if period_col == 'month':
+                next_quarter = period // 3 + 1
+                shifted = [period, period + periods_per_year] + list(range(next_quarter * 3, next_quarter * 3 + 3))
+            else:
+                shifted = [period, period + 1]
+            affected.update((vehicle_type, p) for p in shifted)
+    return affected
+
+
+def splice_periods(new, previous, periods, period_col):
+    """Replace the rows of `previous` in `periods` with the recomputed rows of `new`"""
+    def in_periods(df):
+        keys = pd.MultiIndex.from_arrays([df['vehicle_type'].astype(str), period_index(df, period_col)])
+        return keys.isin(list(periods))
+
+    return pd.concat([previous[~in_periods(previous)], new[in_periods(new)]], ignore_index=True)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import re
+from functools import lru_cache
+
+from atomic import write_json
+
+# ===== FILENAME METADATA =====
+VEHICLE_TYPES = ('2W', '3W', '4W')  # checked in this order, like the original if/elif chain
+YEAR_PATTERN = re.compile(r'20\d{2}')
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+MONTH_PATTERN = re.compile('(' + '|'.join(MONTHS) + ')', re.IGNORECASE)
+MONTH_NUMBERS = {month.upper(): number for number, month in enumerate(MONTHS, start=1)}
+
+
+@lru_cache(maxsize=None)
+def parse_filename(fname):
+    """(vehicle_type, year, month) encoded in a raw file name; year/month are None when absent"""
+    upper = fname.upper()
+    vehicle_type = next((vt for vt in VEHICLE_TYPES if vt in upper), "Unknown")
+    year = YEAR_PATTERN.search(fname)
+    month = MONTH_PATTERN.search(fname)
+    return (vehicle_type,
+            int(year.group(0)) if year else None,
+            MONTH_NUMBERS[month.group(0).upper()] if month else None)
+
+
+# ===== SCHEMA FINGERPRINT CACHE =====
+# Header layouts seen so far and the column roles resolved for them, kept next to the pipeline outputs
+SCHEMA_CACHE_NAME = 'schema_cache.json'
+
+
+def schema_cache_path(folder):
+    return os.path.join(folder, SCHEMA_CACHE_NAME)
+
+
+def load_schema_cache(path):
+    """Load the cache; no path or a missing file is an empty cache"""
+    if path is None or not os.path.exists(path):
+        return {'layouts': {}, 'files': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_schema_cache(path, cache):
+    """Write the cache atomically"""
+    write_json(path, cache)
+
+
+def layout(df):
+    """Column names and dtypes, the part of a frame role inference looks at"""
+    return [[str(col), str(dtype)] for col, dtype in df.dtypes.items()]
+
+
+def fingerprint(columns):
+    """Stable hash of a layout (see layout())"""
+    return hashlib.sha1(json.dumps(columns).encode('utf-8')).hexdigest()[:16]
+
+
+def resolve_roles(columns):
+    """Source columns for 'manufacturer' and 'registrations' (None: nothing to rename)
+
+    The rules clean.py always used: the first maker/manufacturer column; the last column
+    mentioning 'reg', else the last numeric column that is not year/S No/month.
+    """
+    names = [name for name, _ in columns]
+    manufacturer = next((name for name in names if "maker" in name.lower() or "manufactur" in name.lower()), None)
+    renamed = [(('manufacturer' if name == manufacturer else name), dtype) for name, dtype in columns]
+
+    possible_reg_cols = [name for name, _ in renamed if 'reg' in name.lower()]
+    if not possible_reg_cols:
+        possible_reg_cols = [name for name, dtype in renamed
+                             if dtype in ['int64', 'float64'] and name not in ['year', 'S No', 'month']]
+    registrations = None
+    if possible_reg_cols and 'registrations' not in [name for name, _ in renamed]:
+        registrations = possible_reg_cols[-1]
+    return {'manufacturer': manufacturer, 'registrations': registrations}
+
+
+def column_roles(cache, df):
+    """Resolved roles for df's layout, inferred once per distinct layout and then read from the cache"""
+    columns = layout(df)
+    key = fingerprint(columns)
+    entry = cache['layouts'].get(key)
+    if entry is None:
+        entry = cache['layouts'][key] = {'columns': columns, 'roles': resolve_roles(columns)}
+    return entry['roles']
+
+
+def record_file_layout(cache, name, df):
+    """Remember the layout of raw file `name`; returns True when it differs from the last one seen"""
+    columns = layout(df)
+    key = fingerprint(columns)
+    cache['layouts'].setdefault(key, {'columns': columns, 'roles': resolve_roles(columns)})
+    previous = cache['files'].get(name)
+    cache['files'][name] = key
+    return previous is not None and previous != key
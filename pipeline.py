@@ -0,0 +1,99 @@
+import argparse
+import os
+import sys
+import time
+
+import profiling
+from anomalies import anomalies_path, scan_anomalies
+from calculation import compute_growth
+from clean import clean
+from combine import combine, raw_files
+from metadata import load_schema_cache, save_schema_cache, schema_cache_path
+from storage import data_version, load_frame, save_frame
+from summary import build_summary, save_summary, summary_path
+
+# Stage order; each stage's output file name matches what the standalone scripts write
+STAGES = ['combine', 'clean', 'calculation']
+COMBINED_NAME = 'vehicle_registrations_combined.xlsx'
+CLEANED_NAME = 'vehicle_registrations_cleaned.xlsx'
+METRICS_NAME = 'vehicle_growth_metrics.xlsx'
+QUARTERLY_NAME = 'vehicle_growth_metrics_quarterly.xlsx'
+
+__all__ = ['combine', 'clean', 'compute_growth', 'run']
+
+
+def run(output_folder, raw_folder=None, start='combine', end='calculation', workers=1,
+        export_excel=False, keep_intermediates=False, profile=None):
+    """Run stages start..end in one process, passing frames between them in memory
+
+    combine reads `raw_folder`; a later start stage loads the previous stage's output from
+    `output_folder`. The last stage's output is always saved there, intermediate frames only
+    with keep_intermediates=True. profile (see profiling.MODES) writes a trace of every stage and
+    step to `output_folder`; per-stage timings and row counts are printed either way.
+    Returns the last stage's result.
+    """
+    stages = STAGES[STAGES.index(start):STAGES.index(end) + 1]
+    if not stages:
+        raise ValueError(f"stage '{start}' comes after '{end}'")
+    os.makedirs(output_folder, exist_ok=True)
+
+    def path(name):
+        return os.path.join(output_folder, name)
+
+    def keep(stage, df, name):
+        if stage == end or keep_intermediates:
+            save_frame(df, path(name), excel=export_excel)
+
+    # Raw header layouts and resolved column roles persist across runs
+    schema_cache = load_schema_cache(schema_cache_path(output_folder))
+
+    profiler = profiling.start('pipeline', profile)
+    result = None
+    for stage in stages:
+        began = time.perf_counter()
+        with profiler.stage(stage, result) as record:
+            if stage == 'combine':
+                if raw_folder is None:
+                    raise ValueError("raw_folder is required to start from combine")
+                result = combine(raw_files(raw_folder), workers=workers, schema_cache=schema_cache)
+                keep(stage, result, COMBINED_NAME)
+            elif stage == 'clean':
+                result = clean(result if result is not None else load_frame(path(COMBINED_NAME)), schema_cache)
+                keep(stage, result, CLEANED_NAME)
+            else:
+                result = compute_growth(result if result is not None else load_frame(path(CLEANED_NAME)))
+                if stage == end or keep_intermediates:
+                    save_frame(result[0], path(METRICS_NAME), excel=export_excel, sheet_name='Monthly_with_Growth')
+                    save_frame(result[1], path(QUARTERLY_NAME), excel=export_excel, sheet_name='Quarterly_Growth')
+                    save_summary(build_summary(result[0], result[1], data_version([path(METRICS_NAME), path(QUARTERLY_NAME)])),
+                                 summary_path(path(METRICS_NAME)))
+                    save_frame(scan_anomalies(*result), anomalies_path(path(METRICS_NAME)), excel=export_excel,
+                               sheet_name='Anomalies')
+            record['rows_out'] = result
+        print(f"⏱️ {stage}: {time.perf_counter() - began:.2f}s")
+    save_schema_cache(schema_cache_path(output_folder), schema_cache)
+    profiler.finish(output_folder)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the registration pipeline stages in one process")
+    parser.add_argument('output_folder', help="folder for stage outputs (and inputs when starting after combine)")
+    parser.add_argument('--raw-folder', help="raw workbooks folder (required when starting from combine)")
+    parser.add_argument('--start', choices=STAGES, default='combine', help="first stage to run")
+    parser.add_argument('--end', choices=STAGES, default='calculation', help="last stage to run")
+    parser.add_argument('--workers', type=int, default=1, help="processes used to parse raw files")
+    parser.add_argument('--excel', action='store_true', help="also write .xlsx exports of saved outputs")
+    parser.add_argument('--keep-intermediates', action='store_true', help="save every stage's output, not only the last")
+    parser.add_argument('--profile', choices=[mode for mode in profiling.MODES if mode],
+                        help="write a per-stage trace (with peak memory) or also a cProfile dump to the output folder")
+    args = parser.parse_args(argv)
+
+    run(args.output_folder, raw_folder=args.raw_folder, start=args.start, end=args.end, workers=args.workers,
+        export_excel=args.excel, keep_intermediates=args.keep_intermediates, profile=args.profile)
+    print("✅ Pipeline run complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import argparse
+import hashlib
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from combine import raw_files
+from incremental import file_hash
+from metadata import SCHEMA_CACHE_NAME
+from snapshots import (current, finish_snapshot, list_snapshots, metric_files, publish, snapshot_folder,
+                       snapshot_id, snapshot_info)
+
+# ===== CONFIG =====
+RAW_DATA_FOLDER = r"C:\Users\shash\OneDrive\Desktop\free\raw data"
+SNAPSHOT_ROOT = r"C:\Users\shash\OneDrive\Desktop\free\metrics"  # snapshots/ and current.json live here
+POLL_SECONDS = 30  # how often the raw folder is checked for changes
+KEEP_SNAPSHOTS = 3  # finished snapshots kept; older ones are deleted once a newer one is published
+NICE = 10  # the build process runs at this lower CPU priority where the OS supports it
+BUILD_SQLITE = True  # also write the dashboard's SQLite store into each snapshot (BACKEND = "sqlite")
+
+
+# ===== RAW DATA STATE =====
+def raw_state(raw_folder):
+    """(name, mtime, size) of every raw workbook; cheap to poll"""
+    state = []
+    for file in raw_files(raw_folder):
+        stat = os.stat(file)
+        state.append((os.path.basename(file), stat.st_mtime_ns, stat.st_size))
+    return state
+
+
+def source_hash(raw_folder):
+    """Hash of the raw workbooks' names and contents; identical data gives the same snapshot source"""
+    digest = hashlib.sha256()
+    for file in raw_files(raw_folder):
+        digest.update(os.path.basename(file).encode('utf-8'))
+        digest.update(file_hash(file).encode('ascii'))
+    return digest.hexdigest()
+
+
+# ===== BUILD (worker process) =====
+def lower_priority():
+    if hasattr(os, 'nice'):
+        os.nice(NICE)
+
+
+def build_snapshot(raw_folder, root, snapshot, source, previous=None, workers=1, build_sqlite=True):
+    """Run the whole pipeline into a new snapshot folder and mark it finished
+
+    Runs in the worker process. Nothing reads the folder until publish() points current.json at it.
+    """
+    from pipeline import run
+    from storage import data_version
+
+    folder = snapshot_folder(root, snapshot)
+    os.makedirs(folder)
+    # Raw layouts resolved for the previous snapshot carry over
+    if previous is not None and os.path.exists(os.path.join(snapshot_folder(root, previous), SCHEMA_CACHE_NAME)):
+        shutil.copy2(os.path.join(snapshot_folder(root, previous), SCHEMA_CACHE_NAME), folder)
+
+    started = time.perf_counter()
+    df_month, df_quarter = run(folder, raw_folder=raw_folder, workers=workers)
+    files = metric_files(root, snapshot)
+    if build_sqlite:
+        from sql_backend import build_database, sqlite_path
+        build_database(sqlite_path(files[0]), df_month, df_quarter, data_version(files))
+    info = {
+        'source': source,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'seconds': round(time.perf_counter() - started, 2),
+        'rows': {'monthly': len(df_month), 'quarterly': len(df_quarter)},
+    }
+    finish_snapshot(root, snapshot, info)
+    return info
+
+
+# ===== PUBLISH AND PRUNE =====
+def prune(root, keep=KEEP_SNAPSHOTS):
+    """Delete all but the newest `keep` finished snapshots (never the current one) and unfinished builds"""
+    published = current(root)
+    current_id = published['snapshot'] if published else None
+    finished = [s for s in list_snapshots(root) if snapshot_info(root, s) is not None]
+    kept = set(finished[-keep:]) | {current_id}
+    for snapshot in list_snapshots(root):
+        if snapshot not in kept:
+            # A reader may still have files open (Windows); those folders go on a later prune
+            shutil.rmtree(snapshot_folder(root, snapshot), ignore_errors=True)
+
+
+def refresh(pool, raw_folder, root, workers=1, build_sqlite=True):
+    """Build and publish a snapshot when the raw data differs from the current one; returns its info"""
+    source = source_hash(raw_folder)
+    published = current(root)
+    if published is not None and published['source'] == source:
+        return None
+
+    snapshot = snapshot_id(source)
+    print(f"🔄 Raw data changed, building snapshot {snapshot}")
+    info = pool.submit(build_snapshot, raw_folder, root, snapshot, source,
+                       published['snapshot'] if published else None, workers, build_sqlite).result()
+    publish(root, snapshot)
+    print(f"✅ Published snapshot {snapshot} ({info['seconds']:.1f}s)")
+    prune(root)
+    return info
+
+
+def watch(raw_folder, root, interval=POLL_SECONDS, once=False, workers=1, build_sqlite=True):
+    """Poll the raw folder and publish a new snapshot whenever its contents change
+
+    Builds run one at a time in a separate low-priority process, so the dashboard's process keeps
+    its CPU; a failed build is reported and retried only after the raw data changes again.
+    With once=True, returns the current snapshot info after at most one build, or None when
+    that build failed.
+    """
+    os.makedirs(root, exist_ok=True)
+    last_state = failed_state = None
+    with ProcessPoolExecutor(max_workers=1, initializer=lower_priority) as pool:
+        while True:
+            state = raw_state(raw_folder)
+            if state != last_state and state != failed_state:
+                try:
+                    refresh(pool, raw_folder, root, workers, build_sqlite)
+                    last_state = state
+                except Exception as e:
+                    print(f"❌ Snapshot build failed, keeping the current snapshot: {e!r}")
+                    failed_state = state
+                    prune(root)
+            if once:
+                # This run's build failed: an older current snapshot does not make it a success
+                return None if failed_state == state else current(root)
+            time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the growth metrics into versioned snapshots when raw data changes")
+    parser.add_argument('--raw-folder', default=RAW_DATA_FOLDER, help="raw workbooks folder to watch")
+    parser.add_argument('--root', default=SNAPSHOT_ROOT, help="folder the snapshots and current.json are published to")
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS, help="seconds between raw folder checks")
+    parser.add_argument('--once', action='store_true', help="build at most one snapshot, then exit")
+    parser.add_argument('--workers', type=int, default=1, help="processes used to parse raw files within a build")
+    parser.add_argument('--no-sqlite', action='store_true', help="do not write the SQLite store into snapshots")
+    args = parser.parse_args(argv)
+
+    published = watch(args.raw_folder, args.root, interval=args.interval, once=args.once, workers=args.workers,
+                      build_sqlite=not args.no_sqlite)
+    if published is None:
+        # The one-off build failed (even if an older snapshot is still current); say so to cron/CI
+        return 1
+    print(f"📦 Current snapshot: {published['snapshot']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import cProfile
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+
+# Per-stage wall time and row counts for the pipeline scripts and dashboard reruns; stdlib only, so
+# the dashboard can import it before pandas. Instrumented code calls stage()/laps()/record() below,
+# which do nothing unless a script has start()ed a profiler.
+#
+# Modes (the PROFILE setting of each script):
+#   None        wall time and rows in/out per stage, printed as a table at the end
+#   "trace"     also peak traced memory per stage (tracemalloc), written as a JSON trace
+#   "cprofile"  "trace" plus a cProfile dump of the whole run (open with pstats or snakeviz)
+MODES = (None, 'trace', 'cprofile')
+TRACE_SUFFIX = '_profile.json'
+CPROFILE_SUFFIX = '_profile.prof'
+
+_active = ContextVar('profiler', default=None)
+
+
+def n_rows(obj):
+    """Row count of a frame/array, a sequence of them (summed), or an int; None when unknown"""
+    if obj is None or isinstance(obj, int):
+        return obj
+    if isinstance(obj, (tuple, list)):
+        counts = [n_rows(item) for item in obj]
+        return None if None in counts else sum(counts)
+    return len(obj)
+
+
+def trace_path(folder, name):
+    return os.path.join(folder, name + TRACE_SUFFIX)
+
+
+def cprofile_path(folder, name):
+    return os.path.join(folder, name + CPROFILE_SUFFIX)
+
+
+class Laps:
+    """Lap timer for flat code: each call records the time since the previous one as a stage"""
+
+    def __init__(self, profiler, prefix, rows):
+        self.profiler, self.prefix = profiler, prefix
+        self.restart(rows)
+
+    def restart(self, rows=None):
+        """Start the next lap now, without recording the time since the last one"""
+        if self.profiler is not None:
+            # Not registered as an open stage (a lap timer has no end); its peak is read from the
+            # windows folded since the lap started
+            self.profiler._fold_peak()
+            self.window = len(self.profiler._peaks)
+            self.rows = n_rows(rows)
+            self.began = time.perf_counter()
+
+    def __call__(self, name, rows_out=None, rows_in=None):
+        """Record a lap; rows_in defaults to the previous lap's rows_out"""
+        if self.profiler is None:
+            return
+        seconds = time.perf_counter() - self.began
+        self.profiler._fold_peak()
+        rows_out = n_rows(rows_out)
+        label = f"{self.prefix}: {name}" if self.prefix else name
+        peak = max(self.profiler._peaks[self.window:], default=0)
+        self.profiler.add(label, seconds, self.rows if rows_in is None else n_rows(rows_in), rows_out,
+                          peak, began=self.began)
+        self.restart(rows_out)
+
+
+class Profiler:
+    """Stage records of one run: seconds, rows in/out and (when tracing) peak memory"""
+
+    def __init__(self, name, mode=None):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}, expected one of {MODES}")
+        self.name, self.mode = name, mode
+        self.memory = mode is not None
+        self.records = []
+        self._open = []  # running peaks of the stages still open
+        self._peaks = []  # peak of every window between two folds, for lap timers
+        self._depth = 0
+        self._cprofile = None
+        self._own_tracing = False
+        self.began = time.perf_counter()
+
+    def _fold_peak(self):
+        # Peak traced memory since the last reset goes to every open stage, then a new window starts
+        if not self.memory:
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self._peaks.append(peak)
+        for entry in self._open:
+            entry['peak'] = max(entry['peak'], peak)
+
+    def add(self, stage, seconds, rows_in=None, rows_out=None, peak_bytes=None, began=None):
+        """Append one stage record (also used for work timed elsewhere, e.g. in worker processes)"""
+        record = {
+            'stage': stage,
+            'start': round((began if began is not None else time.perf_counter() - seconds) - self.began, 4),
+            'seconds': round(seconds, 4),
+            'depth': self._depth,
+            'rows_in': n_rows(rows_in),
+            'rows_out': n_rows(rows_out),
+            'peak_mb': round(peak_bytes / 1024 ** 2, 2) if self.memory and peak_bytes is not None else None,
+        }
+        self.records.append(record)
+        return record
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """Time the block as one stage; set result['rows_out'] on the yielded dict"""
+        self._fold_peak()
+        entry = {'peak': 0}
+        self._open.append(entry)
+        result = {'rows_out': None}
+        self._depth += 1
+        began = time.perf_counter()
+        try:
+            yield result
+        finally:
+            seconds = time.perf_counter() - began
+            self._fold_peak()
+            self._open = [other for other in self._open if other is not entry]
+            self._depth -= 1
+            self.add(name, seconds, rows_in, result['rows_out'], entry['peak'], began=began)
+
+    def laps(self, prefix=None, rows=None):
+        return Laps(self, prefix, rows)
+
+    def start(self):
+        """Make this the active profiler and start memory tracing / cProfile for the opt-in modes"""
+        _active.set(self)
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        if self.mode == 'cprofile':
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self.began = time.perf_counter()
+        return self
+
+    def finish(self, folder=None, report=True):
+        """Stop profiling, print the stage table and, in an opt-in mode, write the trace to `folder`"""
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        if self._own_tracing:
+            tracemalloc.stop()
+            self._own_tracing = False
+        if _active.get() is self:
+            _active.set(None)
+        if report:
+            self.print_report()
+        if self.mode is not None and folder is not None:
+            self.save(folder)
+        return self.records
+
+    def ordered_records(self):
+        """Records in start order; a stage and the child it opens at once share a rounded start, parent first"""
+        return sorted(self.records, key=lambda r: (r['start'], r['depth']))
+
+    def print_report(self):
+        print(f"\n⏱️ Profile: {self.name} ({time.perf_counter() - self.began:.2f}s)")
+        print(f"{'stage':<40} {'seconds':>9} {'rows in':>10} {'rows out':>10} {'peak MB':>9}")
+        for record in self.ordered_records():
+            label = ('  ' * record['depth'] + record['stage'])[:40]
+            print(f"{label:<40} {record['seconds']:9.3f} {_fmt(record['rows_in']):>10} "
+                  f"{_fmt(record['rows_out']):>10} {_fmt(record['peak_mb']):>9}")
+
+    def save(self, folder):
+        """Write the JSON trace (and the cProfile dump in "cprofile" mode); returns the trace path"""
+        os.makedirs(folder, exist_ok=True)
+        trace = {
+            'name': self.name,
+            'mode': self.mode,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'seconds': round(time.perf_counter() - self.began, 4),
+            'stages': self.ordered_records(),
+        }
+        path = trace_path(folder, self.name)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, indent=2)
+        print(f"🧾 Profile trace: {path}")
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(cprofile_path(folder, self.name))
+            print(f"🧾 cProfile dump: {cprofile_path(folder, self.name)}")
+        return path
+
+
+def _fmt(value):
+    if value is None:
+        return '-'
+    return f"{value:,}" if isinstance(value, int) else f"{value:.1f}"
+
+
+def start(name, mode=None):
+    """Create and activate a profiler for this run (thread/context local)"""
+    return Profiler(name, mode).start()
+
+
+def active():
+    return _active.get()
+
+
+def stage(name, rows_in=None):
+    """Profiler.stage on the active profiler; a no-op context when none is active"""
+    profiler = _active.get()
+    return profiler.stage(name, rows_in) if profiler is not None else nullcontext({'rows_out': None})
+
+
+def laps(prefix=None, rows=None):
+    """Profiler.laps on the active profiler; calls are no-ops when none is active"""
+    return Laps(_active.get(), prefix, rows)
+
+
+def record(name, seconds, rows_in=None, rows_out=None):
+    """Profiler.add on the active profiler, if any"""
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.add(name, seconds, rows_in, rows_out)
@@ -0,0 +1,88 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+def filter_key(view_type, vt_mask, maker_mask, first, last):
+    """Normalized key for a filter selection: selected codes and the period bucket range
+
+    Date ranges that select the same period buckets share one key.
+    """
+    return (view_type,
+            np.packbits(vt_mask).tobytes(),
+            hashlib.sha1(np.packbits(maker_mask).tobytes()).hexdigest(),
+            first, last)
+
+
+def estimate_size(value):
+    """Approximate memory footprint of a cached value in bytes"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class ResultCache:
+    """Thread-safe LRU cache of per-filter dashboard results, bounded by entry count and memory
+
+    Entries belong to one data version; a lookup with a new version drops everything cached so far.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, max_entries=256):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.version = None
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _clear(self):
+        self._entries.clear()
+        self._sizes.clear()
+        self._total_bytes = 0
+
+    def get_or_compute(self, version, key, compute):
+        """Cached result for `key`, computing and storing it on a miss"""
+        with self._lock:
+            if version != self.version:
+                self._clear()
+                self.version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        size = estimate_size(value)
+
+        with self._lock:
+            # Skip results bigger than the whole cache, and results computed against a stale version
+            if version != self.version or size > self.max_bytes or key in self._entries:
+                return value
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(old_key)
+        return value
+
+    def stats(self):
+        """Entry count, memory use and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._total_bytes,
+                    'hits': self.hits, 'misses': self.misses}
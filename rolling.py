@@ -0,0 +1,79 @@
+import numpy as np
+
+from growth import period_index
+
+# Trailing windows in months for rolling sums and moving averages, and CAGR horizons in years
+ROLLING_WINDOWS = (3, 6, 12)
+CAGR_YEARS = (2, 3)
+
+
+def rolling_cols(windows=ROLLING_WINDOWS, cagr_years=CAGR_YEARS):
+    """Names of the columns add_rolling_metrics adds"""
+    return ([f'registrations_rolling_{w}m' for w in windows] + [f'registrations_avg_{w}m' for w in windows]
+            + [f'CAGR_{y}Y_%' for y in cagr_years])
+
+
+def dense_series(df, group_cols, value_col='registrations', period_col='month'):
+    """Monthly (or quarterly) values laid out as a (group x period) array
+
+    Returns (values, group_ids, offsets, starts): row i of df sits at values[group_ids[i], offsets[i]];
+    periods a group has no row for are 0, and starts[g] is group g's first period offset.
+    """
+    group_ids = df.groupby(group_cols, sort=False, observed=True).ngroup().to_numpy().astype('int64')
+    periods = period_index(df, period_col)
+    offsets = periods - periods.min()
+    n_groups, span = int(group_ids.max()) + 1, int(offsets.max()) + 1
+    values = np.zeros((n_groups, span))
+    np.add.at(values, (group_ids, offsets), df[value_col].to_numpy(dtype='float64'))
+    starts = np.full(n_groups, span, dtype='int64')
+    np.minimum.at(starts, group_ids, offsets)
+    return values, group_ids, offsets, starts
+
+
+def trailing_sums(values, window):
+    """Sum of each month and the window - 1 months before it (NaN until a full window exists)"""
+    cumulative = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=cumulative[:, 1:])
+    sums = np.full(values.shape, np.nan)
+    sums[:, window - 1:] = cumulative[:, window:] - cumulative[:, :-window]
+    return sums
+
+
+def add_rolling_metrics(df, windows=ROLLING_WINDOWS, cagr_years=CAGR_YEARS):
+    """Rolling sums, moving averages and CAGR per vehicle_type/Maker, for all groups in one pass
+
+    A window only counts once it lies entirely after the group's first month; months inside it
+    without a row count as 0. CAGR_nY_% compares the trailing 12-month total with the one n years
+    earlier: ((now / then) ** (1 / n) - 1) * 100, NaN when the earlier total is not positive.
+    """
+    out = df.copy()
+    group_cols = ['vehicle_type', 'Maker']
+    if 'vehicle_category' in out.columns:
+        group_cols.insert(1, 'vehicle_category')
+    valid_rows = out[group_cols].notnull().all(axis=1).to_numpy()
+    for col in rolling_cols(windows, cagr_years):
+        out[col] = np.nan
+    if not valid_rows.any():
+        return out
+
+    values, group_ids, offsets, starts = dense_series(out[valid_rows], group_cols)
+    months = np.arange(values.shape[1])
+    sums = {}
+    for window in sorted(set(windows) | ({12} if cagr_years else set())):
+        window_sums = trailing_sums(values, window)
+        window_sums[months[None, :] < starts[:, None] + window - 1] = np.nan
+        sums[window] = window_sums
+
+    cells = (group_ids, offsets)
+    for window in windows:
+        out.loc[valid_rows, f'registrations_rolling_{window}m'] = sums[window][cells]
+        out.loc[valid_rows, f'registrations_avg_{window}m'] = np.round(sums[window][cells] / window, 2)
+    for years in cagr_years:
+        lag = 12 * years
+        earlier = np.full(values.shape, np.nan)
+        earlier[:, lag:] = sums[12][:, :-lag]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cagr = (np.power(sums[12] / earlier, 1 / years) - 1) * 100
+        cagr = np.where(earlier > 0, np.round(cagr, 2), np.nan)
+        out.loc[valid_rows, f'CAGR_{years}Y_%'] = cagr[cells]
+    return out
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns kept as categoricals (manufacturer is clean.py's name for Maker)
+CATEGORICAL_COLS = ['Maker', 'manufacturer', 'vehicle_type', 'vehicle_category']
+
+# Calendar columns and the narrowest integer type that holds them
+CALENDAR_DTYPES = {'year': 'int16', 'month': 'int8', 'quarter': 'int8'}
+
+# Count columns: int32 when every value fits, int64 otherwise
+COUNT_COLS = ['registrations']
+
+# Columns derived from others on demand and never stored
+DERIVED_COLS = ['year_quarter']
+
+
+def _integral(values):
+    values = values.to_numpy()
+    if values.dtype.kind in 'iu':
+        return True
+    return values.dtype.kind == 'f' and bool(np.all(np.isfinite(values))) and bool(np.all(values == np.round(values)))
+
+
+def apply_schema(df):
+    """Compact dtypes: categoricals for text keys, narrow ints for calendar and count columns
+
+    Columns that do not fit the schema (nulls in an int column, non-integral counts) keep their dtype.
+    Derived columns such as year_quarter are dropped; see with_year_quarter.
+    """
+    out = df.drop(columns=[col for col in DERIVED_COLS if col in df.columns])
+    for col in out.columns:
+        if col in CATEGORICAL_COLS:
+            # Mixed numbers and text (raw header rows) are left for the store to write as text
+            if (not isinstance(out[col].dtype, pd.CategoricalDtype)
+                    and not pd.api.types.infer_dtype(out[col], skipna=True).startswith('mixed')):
+                out[col] = out[col].astype('category')
+        elif col in CALENDAR_DTYPES:
+            if out[col].dtype != CALENDAR_DTYPES[col] and _integral(out[col]):
+                out[col] = out[col].astype(CALENDAR_DTYPES[col])
+        elif col in COUNT_COLS:
+            if _integral(out[col]):
+                info = np.iinfo('int32')
+                fits = out.empty or (out[col].min() >= info.min and out[col].max() <= info.max)
+                out[col] = out[col].astype('int32' if fits else 'int64')
+    return out
+
+
+def year_quarter(df):
+    """'YYYY-Qn' labels built from the year and quarter columns"""
+    return df['year'].astype('int64').astype(str) + '-Q' + df['quarter'].astype('int64').astype(str)
+
+
+def derives_year_quarter(df):
+    """True when with_year_quarter adds a year_quarter column to df"""
+    return 'year_quarter' not in df.columns and {'year', 'quarter'} <= set(df.columns) and not df['year'].isnull().any()
+
+
+def with_year_quarter(df):
+    """df with a year_quarter column after `quarter` (for exports and display)"""
+    if not derives_year_quarter(df):
+        return df
+    out = df.copy()
+    out.insert(out.columns.get_loc('quarter') + 1, 'year_quarter', year_quarter(out))
+    return out
+
+
+def memory_mb(df):
+    return df.memory_usage(deep=True).sum() / 1024 ** 2
+
+
+def compact(df, label):
+    """apply_schema, printing the frame's memory use before and after"""
+    before = memory_mb(df)
+    out = apply_schema(df)
+    print(f"🧮 {label}: {before:.1f} MB -> {memory_mb(out):.1f} MB")
+    return out
@@ -0,0 +1,69 @@
+import json
+import os
+from datetime import datetime
+
+from atomic import write_json
+
+# Versioned metric snapshots published by precompute.py: each build writes a new folder under
+# <root>/snapshots/ that is never modified afterwards, and <root>/current.json names the one
+# readers should use. json/os only, so the dashboard can read the pointer before pandas loads.
+SNAPSHOTS_DIR = 'snapshots'
+CURRENT_NAME = 'current.json'
+SNAPSHOT_INFO_NAME = 'snapshot.json'  # written last; a folder without it is an unfinished build
+
+# Metrics files pipeline.run writes into each snapshot (monthly, quarterly)
+METRIC_NAMES = ('vehicle_growth_metrics.xlsx', 'vehicle_growth_metrics_quarterly.xlsx')
+
+
+def snapshot_id(source_hash, now=None):
+    """Sortable id: build time plus the start of the raw data hash"""
+    return f"{(now or datetime.now()).strftime('%Y%m%dT%H%M%S')}-{source_hash[:12]}"
+
+
+def snapshot_folder(root, snapshot):
+    return os.path.join(os.path.abspath(root), SNAPSHOTS_DIR, snapshot)
+
+
+def metric_files(root, snapshot):
+    """(monthly, quarterly) metrics paths inside a snapshot"""
+    folder = snapshot_folder(root, snapshot)
+    return tuple(os.path.join(folder, name) for name in METRIC_NAMES)
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def finish_snapshot(root, snapshot, info):
+    """Mark a snapshot folder complete; it is read-only from here on"""
+    write_json(os.path.join(snapshot_folder(root, snapshot), SNAPSHOT_INFO_NAME), dict(info, snapshot=snapshot))
+
+
+def snapshot_info(root, snapshot):
+    """The info a finished snapshot was published with, or None for a missing/unfinished one"""
+    return _read_json(os.path.join(snapshot_folder(root, snapshot), SNAPSHOT_INFO_NAME))
+
+
+def publish(root, snapshot):
+    """Point readers at a finished snapshot; os.replace makes the switch atomic"""
+    info = snapshot_info(root, snapshot)
+    if info is None:
+        raise ValueError(f"snapshot {snapshot} is not finished")
+    write_json(os.path.join(os.path.abspath(root), CURRENT_NAME), info)
+    return info
+
+
+def current(root):
+    """Info of the published snapshot (snapshot id, source hash, ...), or None before the first publish"""
+    return _read_json(os.path.join(os.path.abspath(root), CURRENT_NAME))
+
+
+def list_snapshots(root):
+    """Snapshot ids under root, oldest first"""
+    folder = os.path.join(os.path.abspath(root), SNAPSHOTS_DIR)
+    if not os.path.isdir(folder):
+        return []
+    return sorted(name for name in os.listdir(folder) if os.path.isdir(os.path.join(folder, name)))
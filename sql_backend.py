@@ -0,0 +1,205 @@
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from atomic import replacing
+from filter_index import MEAN_COLS, SUM_COLS
+from growth import period_index
+from schema import apply_schema, year_quarter
+
+# On-disk SQLite store of the growth metrics, shared by every dashboard session and process
+SQLITE_EXT = '.sqlite'
+MONTHLY_TABLE = 'monthly'
+QUARTERLY_TABLE = 'quarterly'
+
+# Helper columns added to each table: integer codes for the filters and the period bucket
+HELPER_COLS = ['vt_code', 'maker_code', 'period_id', 'range_value', 'period_label']
+
+
+def sqlite_path(path):
+    """SQLite store path for a monthly metrics .xlsx path"""
+    return os.path.splitext(path)[0] + SQLITE_EXT
+
+
+def _labels(values):
+    return np.asarray(sorted(pd.Series(values).dropna().astype(str).unique()), dtype=object)
+
+
+def _table_frame(df, vehicle_types, makers, period_id, range_value, period_label):
+    out = df.copy()
+    out['vt_code'] = pd.Categorical(out['vehicle_type'].astype(str), categories=vehicle_types).codes
+    out['maker_code'] = pd.Categorical(out['Maker'].astype(str), categories=makers).codes
+    out['period_id'] = period_id
+    out['range_value'] = range_value
+    out['period_label'] = period_label
+    # Rows without a Maker or vehicle_type can never be selected
+    out = out[df['Maker'].notnull().to_numpy() & df['vehicle_type'].notnull().to_numpy()]
+    for col in out.columns:
+        if isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(object)
+    return out
+
+
+def build_database(path, df_month, df_quarter, version):
+    """Write both metric frames to a fresh SQLite file, indexed for the dashboard filters, then swap it in"""
+    vehicle_types = _labels(pd.concat([df_month['vehicle_type'].astype(object), df_quarter['vehicle_type'].astype(object)]))
+    makers = _labels(pd.concat([df_month['Maker'].astype(object), df_quarter['Maker'].astype(object)]))
+
+    dates = pd.to_datetime(df_month['date'])
+    monthly = _table_frame(df_month, vehicle_types, makers, period_index(df_month, 'month'),
+                           dates.dt.strftime('%Y-%m-%d').to_numpy(), dates.dt.strftime('%Y-%m-%d').to_numpy())
+    quarterly = _table_frame(df_quarter, vehicle_types, makers, period_index(df_quarter, 'quarter'),
+                             df_quarter['year'].astype('int64').to_numpy(), year_quarter(df_quarter).to_numpy())
+
+    with replacing(path) as tmp_path:
+        with closing(sqlite3.connect(tmp_path)) as conn:
+            for table, frame in [(MONTHLY_TABLE, monthly), (QUARTERLY_TABLE, quarterly)]:
+                frame.to_sql(table, conn, index=False)
+                conn.execute(f'CREATE INDEX {table}_filters ON {table} (vt_code, maker_code, period_id)')
+                conn.execute(f'CREATE INDEX {table}_periods ON {table} (period_id, vt_code, maker_code)')
+            conn.execute('CREATE TABLE labels (kind TEXT, code INTEGER, label TEXT)')
+            conn.executemany('INSERT INTO labels VALUES (?, ?, ?)',
+                             [('vehicle_type', i, v) for i, v in enumerate(vehicle_types)]
+                             + [('Maker', i, m) for i, m in enumerate(makers)])
+            conn.execute('CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('INSERT INTO meta VALUES (?, ?)', ('version', json.dumps(version)))
+            conn.commit()
+    print(f"🗄️ SQLite store: {path}")
+    return path
+
+
+def database_version(path):
+    """The data_version a store was built from, or None when there is no usable store"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with closing(_connect(path)) as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.Error:
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def _connect(path):
+    # One short-lived read-only connection per query, so sessions and threads never share one
+    return sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+
+
+class SqlIndex:
+    """FilterIndex-compatible queries pushed down to one table of the SQLite store
+
+    Selections are turned into WHERE clauses over integer codes and period ids, and KPIs,
+    trends and per-Maker averages into GROUP BY aggregates; only results come back to Python.
+    """
+
+    def __init__(self, path, table):
+        self.path, self.table = path, table
+        with closing(_connect(path)) as conn:
+            labels = pd.read_sql_query('SELECT kind, code, label FROM labels ORDER BY kind, code', conn)
+            buckets = pd.read_sql_query(f'SELECT DISTINCT period_id, range_value, period_label FROM {table} '
+                                        f'ORDER BY period_id', conn)
+            columns = [(row[1], row[2]) for row in conn.execute(f'PRAGMA table_info({table})')]
+        self.vehicle_types = labels.loc[labels['kind'] == 'vehicle_type', 'label'].to_numpy(dtype=object)
+        self.makers = labels.loc[labels['kind'] == 'Maker', 'label'].to_numpy(dtype=object)
+        buckets = buckets.drop_duplicates('period_id')
+        self.period_ids = buckets['period_id'].to_numpy('int64')
+        self.monthly = table == MONTHLY_TABLE
+        if self.monthly:
+            self.period_ranges = pd.to_datetime(buckets['range_value']).to_numpy()
+            self.period_labels = pd.to_datetime(buckets['period_label']).to_numpy()
+        else:
+            self.period_ranges = buckets['range_value'].to_numpy('int64')
+            self.period_labels = buckets['period_label'].to_numpy(dtype=object)
+        self.columns = [col for col, _ in columns if col not in HELPER_COLS]
+        # A page whose REAL column is all NULL comes back as object; keep it float like the metrics files
+        self.real_cols = [col for col, decl in columns if decl == 'REAL' and col not in HELPER_COLS]
+        self.mean_cols = [col for col in MEAN_COLS if col in self.columns]
+        self.sum_cols = [col for col in SUM_COLS if col in self.columns]
+
+    def period_range(self, start, end):
+        """[first, last) period bucket numbers whose range value lies within start..end"""
+        return (int(np.searchsorted(self.period_ranges, start, side='left')),
+                int(np.searchsorted(self.period_ranges, end, side='right')))
+
+    def masks(self, vehicle_types, makers):
+        """Boolean lookup arrays over vehicle_type and Maker codes for a selection"""
+        return np.isin(self.vehicle_types, list(vehicle_types)), np.isin(self.makers, list(makers))
+
+    def _where(self, vt_mask, maker_mask, first, last):
+        if first >= last or not vt_mask.any() or not maker_mask.any():
+            return '0', []
+        clauses = ['period_id BETWEEN ? AND ?']
+        params = [int(self.period_ids[first]), int(self.period_ids[last - 1])]
+        for col, mask in [('vt_code', vt_mask), ('maker_code', maker_mask)]:
+            if mask.all():
+                continue
+            # Pass whichever of the selected / unselected code lists is shorter
+            if mask.sum() <= (~mask).sum():
+                clauses.append(f'{col} IN (SELECT value FROM json_each(?))')
+                params.append(json.dumps(np.flatnonzero(mask).tolist()))
+            else:
+                clauses.append(f'{col} NOT IN (SELECT value FROM json_each(?))')
+                params.append(json.dumps(np.flatnonzero(~mask).tolist()))
+        return ' AND '.join(clauses), params
+
+    def _query(self, sql, params):
+        with closing(_connect(self.path)) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def filtered_rows(self, vt_mask, maker_mask, first, last):
+        """Rows of the selection, in (period, vehicle_type, Maker) order"""
+        where, params = self._where(vt_mask, maker_mask, first, last)
+        columns = ', '.join(f'"{col}"' for col in self.columns)
+        rows = self._query(f'SELECT {columns} FROM {self.table} WHERE {where} '
+                           f'ORDER BY period_id, vt_code, maker_code, rowid', params)
+        if 'date' in rows.columns:
+            rows['date'] = pd.to_datetime(rows['date'])
+        return apply_schema(rows.astype({col: 'float64' for col in self.real_cols}))
+
+    def totals(self, vt_mask, maker_mask, first, last):
+        """Total registrations and the row-weighted mean of each growth column"""
+        where, params = self._where(vt_mask, maker_mask, first, last)
+        aggregates = ['TOTAL(registrations)'] + [f'AVG("{col}")' for col in self.mean_cols]
+        row = self._query(f'SELECT {", ".join(aggregates)} FROM {self.table} WHERE {where}', params).iloc[0]
+        result = {'registrations': float(row.iloc[0])}
+        for i, col in enumerate(self.mean_cols, start=1):
+            result[col] = np.nan if pd.isnull(row.iloc[i]) else float(row.iloc[i])
+        return result
+
+    def trend(self, vt_mask, maker_mask, first, last, value_col='registrations'):
+        """Registrations (or another summed column) per (vehicle_type, period) over the selection"""
+        where, params = self._where(vt_mask, maker_mask, first, last)
+        out = self._query(f'SELECT vt_code, period_id, TOTAL("{value_col}") AS value FROM {self.table} '
+                          f'WHERE {where} GROUP BY vt_code, period_id HAVING COUNT("{value_col}") > 0', params)
+        return pd.DataFrame({
+            'vehicle_type': self.vehicle_types[out['vt_code'].to_numpy('int64')],
+            'period': self.period_labels[np.searchsorted(self.period_ids, out['period_id'].to_numpy('int64'))],
+            value_col: out['value'].to_numpy('float64'),
+        }).sort_values(['period', 'vehicle_type'], kind='mergesort').reset_index(drop=True)
+
+    def by_maker(self, vt_mask, maker_mask, first, last):
+        """Per-Maker registrations and mean growth over the selection (Makers with rows only)"""
+        where, params = self._where(vt_mask, maker_mask, first, last)
+        aggregates = ['TOTAL(registrations) AS registrations'] + [f'AVG("{col}") AS "{col}"' for col in self.mean_cols]
+        out = self._query(f'SELECT maker_code, {", ".join(aggregates)} FROM {self.table} WHERE {where} '
+                          f'GROUP BY maker_code ORDER BY maker_code', params)
+        out.insert(0, 'Maker', self.makers[out.pop('maker_code').to_numpy('int64')])
+        # An all-NULL average comes back as None; keep NaN floats like FilterIndex
+        return out.astype({col: 'float64' for col in ['registrations'] + self.mean_cols})
+
+
+def open_database(path, version, load_frames=None):
+    """(monthly, quarterly) SqlIndex over the store at `path`, rebuilding it first when `version` changed
+
+    load_frames() -> (df_month, df_quarter) is only called for a rebuild. Without it the folder is
+    treated as read-only (a published snapshot): None is returned when there is no current store.
+    """
+    if database_version(path) != json.loads(json.dumps(version)):
+        if load_frames is None:
+            return None
+        build_database(path, *load_frames(), version)
+    return SqlIndex(path, MONTHLY_TABLE), SqlIndex(path, QUARTERLY_TABLE)
@@ -0,0 +1,77 @@
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from atomic import replacing
+from schema import apply_schema
+
+# Intermediate files are stored as Parquet next to the .xlsx path each script is configured with
+PARQUET_EXT = '.parquet'
+
+
+def parquet_path(path):
+    """Columnar store path for an .xlsx path (same folder and name, .parquet extension)"""
+    return os.path.splitext(path)[0] + PARQUET_EXT
+
+
+def to_store_dtypes(df):
+    """Make a frame Parquet-safe: schema dtypes (see schema.py), mixed object columns as text"""
+    out = apply_schema(df)
+    for col in out.columns:
+        if out[col].dtype == object and pd.api.types.infer_dtype(out[col], skipna=True).startswith('mixed'):
+            # Raw sheets mix numbers and header text in one column; keep values, store them as text
+            out[col] = out[col].where(out[col].isnull(), out[col].astype(str))
+    return out
+
+
+def save_frame(df, path, excel=False, sheet_name='Sheet1'):
+    """Save df to the columnar store, and to `path` as Excel only when excel=True"""
+    store_file = parquet_path(path)
+    # Written aside and swapped in, so readers never see a half-written store
+    with replacing(store_file) as tmp_file:
+        to_store_dtypes(df).to_parquet(tmp_file, index=False)
+    print(f"💾 Stored: {store_file}")
+    if excel:
+        from excel_export import write_workbook  # openpyxl only loads for exports
+        write_workbook(path, {sheet_name: df})
+    return store_file
+
+
+def load_frame(path, sheet_name=0):
+    """Load a frame from the columnar store (memory-mapped), falling back to the .xlsx file"""
+    store_file = parquet_path(path)
+    if os.path.exists(store_file):
+        return pd.read_parquet(store_file, memory_map=True)
+    return pd.read_excel(path, sheet_name=sheet_name)
+
+
+def source_file(path):
+    """The file load_frame(path) reads: the columnar store if present, else the .xlsx"""
+    store_file = parquet_path(path)
+    return store_file if os.path.exists(store_file) else path
+
+
+def data_version(paths):
+    """(file, mtime, size) of the files behind `paths`; changes whenever any of them is rewritten"""
+    version = []
+    for path in paths:
+        file = source_file(path)
+        stat = os.stat(file)
+        version.append((file, stat.st_mtime_ns, stat.st_size))
+    return tuple(version)
+
+
+def iter_frames(path, chunk_rows, sheet_name=0):
+    """Yield the frame behind `path` in chunks of at most `chunk_rows` rows
+
+    Streams record batches from the columnar store; an .xlsx fallback is read whole and sliced.
+    """
+    store_file = parquet_path(path)
+    if os.path.exists(store_file):
+        for batch in pq.ParquetFile(store_file, memory_map=True).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        for start in range(0, len(df), chunk_rows):
+            yield df.iloc[start:start + chunk_rows]
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from schema import apply_schema
+
+# Per-chunk totals held back before they are folded into the running aggregate
+FOLD_EVERY_ROWS = 200_000
+
+
+def period_dates(periods):
+    """First-of-month dates for running month numbers (year * 12 + month - 1), built arithmetically"""
+    months = np.asarray(periods, dtype='int64') - 1970 * 12
+    return pd.Series(months.astype('datetime64[M]').astype('datetime64[ns]'))
+
+
+def chunk_monthly_totals(chunk, month_map, group_cols):
+    """Registrations per (group, month number) for one wide chunk, without melting it"""
+    month_cols = [col for col in chunk.columns if str(col).upper() in month_map]
+    years = pd.to_numeric(chunk['year'], errors='coerce')
+    valid = years.notnull().to_numpy()
+    if not valid.any() or not month_cols:
+        return None
+
+    keys = chunk.loc[valid, group_cols].astype(object).reset_index(drop=True)
+    base_periods = years[valid].astype('int64').to_numpy() * 12
+    parts = []
+    for col in month_cols:
+        part = keys.copy()
+        part['period'] = base_periods + (month_map[str(col).upper()] - 1)
+        part['registrations'] = pd.to_numeric(chunk.loc[valid, col], errors='coerce').fillna(0).to_numpy()
+        parts.append(part)
+    long_chunk = pd.concat(parts, ignore_index=True)
+    return long_chunk.groupby(group_cols + ['period'], sort=False)['registrations'].sum()
+
+
+def _fold(running, pending, n_levels):
+    combined = pd.concat(([running] if running is not None else []) + pending)
+    return combined.groupby(level=list(range(n_levels)), sort=False).sum()
+
+
+def stream_aggregates(chunks, month_map, row_filter=None):
+    """Fold wide chunks into monthly and quarterly registration totals
+
+    Returns (monthly_summary, quarterly_summary) shaped like the melt + groupby path in
+    calculation.py. Peak memory is bounded by the number of (group, month) totals plus one chunk.
+    """
+    running, pending, pending_rows = None, [], 0
+    group_cols, n_chunks, n_rows = None, 0, 0
+    for chunk in chunks:
+        n_chunks += 1
+        n_rows += len(chunk)
+        if row_filter is not None:
+            chunk = chunk[row_filter(chunk)]
+        if group_cols is None:
+            group_cols = ['vehicle_type', 'Maker']
+            if 'vehicle_category' in chunk.columns:
+                group_cols.insert(1, 'vehicle_category')
+        totals = chunk_monthly_totals(chunk, month_map, group_cols)
+        if totals is None:
+            continue
+        pending.append(totals)
+        pending_rows += len(totals)
+        if pending_rows >= FOLD_EVERY_ROWS:
+            running = _fold(running, pending, len(group_cols) + 1)
+            pending, pending_rows = [], 0
+    if pending:
+        running = _fold(running, pending, len(group_cols) + 1)
+    print(f"✅ Streamed {n_rows} rows in {n_chunks} chunk(s)")
+
+    if group_cols is None:
+        group_cols = ['vehicle_type', 'Maker']
+    if running is None:
+        running = pd.Series([], dtype='float64', name='registrations',
+                            index=pd.MultiIndex.from_arrays([[]] * (len(group_cols) + 1), names=group_cols + ['period']))
+
+    # Monthly totals, with date/year/month derived from the month number
+    monthly = running.reset_index()
+    periods = monthly.pop('period').to_numpy('int64')
+    monthly['date'] = period_dates(periods)
+    monthly['year'] = periods // 12
+    monthly['month'] = periods % 12 + 1
+    group_cols_monthly = group_cols + ['date', 'year', 'month']
+    monthly = monthly.dropna(subset=group_cols)
+    monthly_summary = monthly.sort_values(group_cols_monthly)[group_cols_monthly + ['registrations']].reset_index(drop=True)
+
+    # Quarterly totals are sums of the monthly ones
+    monthly['quarter'] = (monthly['month'] - 1) // 3 + 1
+    quarterly_summary = monthly.groupby(group_cols + ['year', 'quarter'], sort=True)['registrations'].sum().reset_index()
+    return apply_schema(monthly_summary), apply_schema(quarterly_summary)
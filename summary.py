@@ -0,0 +1,62 @@
+import json
+import os
+
+from atomic import write_json
+
+# Small precomputed summary the dashboard paints its first page from; json/os only, so reading
+# it does not pull in pandas
+SUMMARY_SUFFIX = '_summary.json'
+
+
+def summary_path(path):
+    """Summary file for a monthly metrics path (same folder and name, _summary.json suffix)"""
+    return os.path.splitext(path)[0] + SUMMARY_SUFFIX
+
+
+def _totals(df):
+    # Same numbers FilterIndex.totals gives for the full selection: rows without Maker/vehicle_type are skipped
+    df = df[df['Maker'].notnull() & df['vehicle_type'].notnull()]
+    totals = {'registrations': float(df['registrations'].sum())}
+    for col in ['YoY_growth_%', 'QoQ_growth_%']:
+        if col in df.columns:
+            mean = df[col].mean()
+            totals[col] = None if mean != mean else float(mean)
+    return totals
+
+
+def _labels(values):
+    return [str(value) for value in values.dropna().unique()]
+
+
+def build_summary(df_month, df_quarter, version):
+    """Filter options and full-selection KPIs for both views, tagged with the data_version they describe"""
+    return {
+        'version': [list(entry) for entry in version],
+        'vehicle_types': _labels(df_month['vehicle_type']),
+        'makers': _labels(df_month['Maker']),
+        'min_date': df_month['date'].min().date().isoformat(),
+        'max_date': df_month['date'].max().date().isoformat(),
+        'min_year': int(df_quarter['year'].min()),
+        'max_year': int(df_quarter['year'].max()),
+        'totals': {'Monthly': _totals(df_month), 'Quarterly': _totals(df_quarter)},
+    }
+
+
+def save_summary(summary, path):
+    """Write the summary atomically next to the metrics files"""
+    write_json(path, summary, indent=None)
+
+
+def load_summary(path):
+    """The summary at `path`, or None when it is missing or the files it describes were rewritten since"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        summary = json.load(f)
+    for file, mtime_ns, size in summary['version']:
+        if not os.path.exists(file):
+            return None
+        stat = os.stat(file)
+        if (stat.st_mtime_ns, stat.st_size) != (mtime_ns, size):
+            return None
+    return summary
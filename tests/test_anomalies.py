@@ -0,0 +1,27 @@
+import numpy as np
+
+from anomalies import MIN_HISTORY, MIN_SCALE, Z_THRESHOLD, robust_scores
+
+
+def test_flat_history_is_scored_against_the_scale_floor():
+    # Twelve identical months: MAD is 0, so the floor is the only spread
+    history = np.log1p(np.full(12, 100.0))
+    jump_10x = np.log1p(1000.0)
+    jump_2x = np.log1p(200.0)
+    values = np.vstack([np.append(history, jump_10x), np.append(history, jump_2x), np.append(history, np.log1p(100.0))])
+
+    median, z = robust_scores(values, window=12)
+    assert np.allclose(median[:, -1], np.log1p(100.0))
+    np.testing.assert_allclose(z[:, -1], (values[:, -1] - np.log1p(100.0)) / MIN_SCALE)
+    # Still scored: a 10x jump flags, a 2x move and no move do not
+    assert z[0, -1] >= Z_THRESHOLD
+    assert abs(z[1, -1]) < Z_THRESHOLD
+    assert z[2, -1] == 0
+
+
+def test_short_history_is_not_scored():
+    # MIN_HISTORY - 1 values before the spike, and a row that is all missing history
+    values = np.log1p(np.array([[np.nan] * (13 - MIN_HISTORY) + [100.0] * (MIN_HISTORY - 1) + [10000.0],
+                                [np.nan] * 12 + [5.0]]))
+    _, z = robust_scores(values, window=12)
+    assert np.isnan(z).all()
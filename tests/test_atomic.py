@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from atomic import replacing, write_json
+
+
+def test_replacing_swaps_in_a_readable_file(tmp_path):
+    path = tmp_path / 'store.parquet'
+    path.write_text('old')
+    with replacing(str(path)) as tmp_file:
+        assert os.path.dirname(tmp_file) == str(tmp_path)
+        with open(tmp_file, 'w') as f:
+            f.write('new')
+        # Readers still see the old file until the block finishes
+        assert path.read_text() == 'old'
+    assert path.read_text() == 'new'
+    assert os.stat(path).st_mode & 0o777 == 0o644
+    assert os.listdir(tmp_path) == ['store.parquet']
+
+
+def test_failed_write_keeps_the_old_file_and_no_temporary(tmp_path):
+    path = tmp_path / 'summary.json'
+    write_json(str(path), {'rows': 1})
+    with pytest.raises(TypeError):
+        write_json(str(path), {'rows': object()})
+    assert path.read_text() == '{\n  "rows": 1\n}'
+    assert os.listdir(tmp_path) == ['summary.json']
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean import pivot_months
+
+
+def pivot_table_months(df, pivot_cols):
+    """groupby + pivot_table, as clean() pivoted before pivot_months"""
+    df_grouped = df.groupby(pivot_cols + ['month'], as_index=False, observed=True)['registrations'].sum()
+    df_pivot = df_grouped.pivot_table(index=pivot_cols, columns='month', values='registrations', fill_value=0,
+                                      observed=True)
+    df_pivot.columns = [f"month_{int(col)}" for col in df_pivot.columns]
+    df_pivot = df_pivot.reset_index()
+    df_pivot['S No'] = range(1, len(df_pivot) + 1)
+    return df_pivot
+
+
+def long_frame(n=500, seed=2):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'manufacturer': rng.choice(['HERO', 'BAJAJ', 'TVS', 'ATHER', 'OLA'], n),
+        'year': rng.choice([2023, 2024], n),
+        'vehicle_type': rng.choice(['2W', '3W'], n),
+        'vehicle_category': rng.choice(['EV', 'ICE'], n),
+        # Month 7 never occurs, so there is no month_7 column
+        'month': rng.choice([1, 2, 3, 4, 5, 6, 8, 9, 10, 11, 12], n),
+        'registrations': rng.integers(0, 1000, n),
+    })
+
+
+@pytest.mark.parametrize('pivot_cols', [['manufacturer', 'year', 'vehicle_type'],
+                                        ['manufacturer', 'year', 'vehicle_type', 'vehicle_category']])
+@pytest.mark.parametrize('categorical', [False, True])
+def test_pivot_months_matches_pivot_table(pivot_cols, categorical):
+    df = long_frame()
+    if categorical:
+        for col in ['manufacturer', 'vehicle_type', 'vehicle_category']:
+            df[col] = df[col].astype('category')
+    # Rows outside the mask (and the keys only they carry) are left out
+    rows = (df['manufacturer'] != 'OLA').to_numpy() & (np.arange(len(df)) % 7 != 0)
+
+    result = pivot_months(df, pivot_cols, rows)
+    expected = pivot_table_months(df[rows], pivot_cols)
+    assert list(result.columns) == list(expected.columns)
+    assert 'month_7' not in result.columns
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, check_categorical=False)
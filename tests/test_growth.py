@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculation import calculate_qoq_quarterly, calculate_yoy_monthly
+from growth import join_period_values
+
+
+def reference_growth(df, period_col, periods_per_year, lag, prev_col, growth_col):
+    """Per-group lookup of the value `lag` periods earlier, as the original row-by-row loop did it"""
+    out = df.sort_values(['vehicle_type', 'Maker', 'year', period_col]).reset_index(drop=True)
+    values = {(row.vehicle_type, row.Maker, row.year * periods_per_year + getattr(row, period_col) - 1): row.registrations
+              for row in out.itertuples()}
+    prev, growth = [], []
+    for row in out.itertuples():
+        period = row.year * periods_per_year + getattr(row, period_col) - 1
+        before = values.get((row.vehicle_type, row.Maker, period - lag), np.nan)
+        prev.append(before)
+        growth.append(round(abs((row.registrations - before) / before * 100), 2) if before > 0 else np.nan)
+    out[prev_col] = prev
+    out[growth_col] = growth
+    return out
+
+
+def monthly_frame():
+    rows = [
+        # 2W/A: Mar 2023 is missing (gap), Jan 2023 is 0 (zero prior), Feb falls year on year (negative change)
+        ('2W', 'A', 2023, 1, 0), ('2W', 'A', 2023, 2, 200), ('2W', 'A', 2023, 4, 50),
+        ('2W', 'A', 2024, 1, 30), ('2W', 'A', 2024, 2, 150), ('2W', 'A', 2024, 3, 80), ('2W', 'A', 2024, 4, 75),
+        # Same maker name under another vehicle type must not be matched across groups
+        ('3W', 'A', 2023, 1, 10), ('3W', 'A', 2024, 1, 5), ('3W', 'A', 2024, 2, 7),
+        # A maker that first appears in 2024 has no prior year
+        ('2W', 'B', 2024, 1, 12), ('2W', 'B', 2024, 2, 0),
+    ]
+    return pd.DataFrame(rows, columns=['vehicle_type', 'Maker', 'year', 'month', 'registrations'])
+
+
+def quarterly_frame():
+    rows = [
+        # Q4 -> Q1 crosses the year; Q2 2024 is missing, so Q3 has no prior quarter
+        ('2W', 'A', 2023, 3, 100), ('2W', 'A', 2023, 4, 0), ('2W', 'A', 2024, 1, 40),
+        ('2W', 'A', 2024, 3, 60), ('2W', 'A', 2024, 4, 15),
+        ('3W', 'A', 2023, 4, 20), ('3W', 'A', 2024, 1, 25),
+    ]
+    return pd.DataFrame(rows, columns=['vehicle_type', 'Maker', 'year', 'quarter', 'registrations'])
+
+
+def assert_same_growth(result, expected, prev_col, growth_col):
+    np.testing.assert_array_equal(result[prev_col].to_numpy(), expected[prev_col].to_numpy(dtype='float64'))
+    np.testing.assert_array_equal(result[growth_col].to_numpy(), expected[growth_col].to_numpy(dtype='float64'))
+
+
+def test_yoy_matches_per_group_reference():
+    df = monthly_frame()
+    result = calculate_yoy_monthly(df)
+    expected = reference_growth(df, 'month', 12, 12, 'registrations_last_year', 'YoY_growth_%')
+    pd.testing.assert_frame_equal(result[list(df.columns)], expected[list(df.columns)])
+    assert_same_growth(result, expected, 'registrations_last_year', 'YoY_growth_%')
+
+
+def test_yoy_edge_cases():
+    result = calculate_yoy_monthly(monthly_frame()).set_index(['vehicle_type', 'Maker', 'year', 'month'])
+    # Zero prior value: the prior is reported, growth is not
+    assert result.loc[('2W', 'A', 2024, 1), 'registrations_last_year'] == 0
+    assert np.isnan(result.loc[('2W', 'A', 2024, 1), 'YoY_growth_%'])
+    # Negative change is reported as its absolute value
+    assert result.loc[('2W', 'A', 2024, 2), 'YoY_growth_%'] == 25.0
+    # Gap: no Mar 2023 row, so no prior value
+    assert np.isnan(result.loc[('2W', 'A', 2024, 3), 'registrations_last_year'])
+    assert result.loc[('3W', 'A', 2024, 1), 'registrations_last_year'] == 10
+
+
+def test_qoq_matches_per_group_reference():
+    df = quarterly_frame()
+    result = calculate_qoq_quarterly(df)
+    expected = reference_growth(df, 'quarter', 4, 1, 'registrations_last_quarter', 'QoQ_growth_%')
+    pd.testing.assert_frame_equal(result[list(df.columns)], expected[list(df.columns)])
+    assert_same_growth(result, expected, 'registrations_last_quarter', 'QoQ_growth_%')
+    result = result.set_index(['vehicle_type', 'Maker', 'year', 'quarter'])
+    assert result.loc[('2W', 'A', 2024, 1), 'registrations_last_quarter'] == 0
+    assert np.isnan(result.loc[('2W', 'A', 2024, 3), 'registrations_last_quarter'])
+    assert result.loc[('2W', 'A', 2024, 4), 'QoQ_growth_%'] == 75.0
+
+
+@pytest.mark.parametrize('calculate, frame, columns', [
+    (calculate_yoy_monthly, monthly_frame, ['registrations_last_year', 'YoY_growth_%']),
+    (calculate_qoq_quarterly, quarterly_frame, ['registrations_last_quarter', 'QoQ_growth_%']),
+])
+def test_growth_on_empty_frame(calculate, frame, columns):
+    result = calculate(frame().iloc[:0])
+    assert result.empty
+    assert set(columns) <= set(result.columns)
+
+
+def merged_period_values(left, right, group_cols, period_col, value_cols):
+    """The left merge join_period_values replaced"""
+    merged = left[group_cols + ['year', period_col]].merge(
+        right[group_cols + ['year', period_col] + value_cols], on=group_cols + ['year', period_col], how='left')
+    return {col: merged[col].to_numpy(dtype='float64') for col in value_cols}
+
+
+@pytest.mark.parametrize('group_cols', [['vehicle_type', 'Maker'], ['vehicle_type', 'vehicle_category', 'Maker']])
+@pytest.mark.parametrize('categorical', [False, True])
+def test_join_period_values_matches_merge(group_cols, categorical):
+    rng = np.random.default_rng(1)
+    n = 200
+    left = pd.DataFrame({
+        'vehicle_type': rng.choice(['2W', '3W', '4W'], n),
+        'vehicle_category': rng.choice(['EV', 'ICE'], n),
+        # 'D' is only on the left and None is a missing key: both get NaN, as in the merge
+        'Maker': rng.choice(['A', 'B', 'C', 'D', None], n),
+        'year': rng.choice([2022, 2023, 2024], n),
+        'quarter': rng.integers(1, 5, n),
+    })
+    right = (pd.DataFrame({
+        'vehicle_type': rng.choice(['2W', '3W'], n),
+        'vehicle_category': rng.choice(['EV', 'ICE'], n),
+        'Maker': rng.choice(['A', 'B', 'C', 'E'], n),
+        'year': rng.choice([2021, 2022, 2023], n),
+        'quarter': rng.integers(1, 5, n),
+    }).drop_duplicates(group_cols + ['year', 'quarter']).reset_index(drop=True))
+    right['registrations_last_quarter'] = rng.integers(0, 100, len(right)).astype('float64')
+    right['QoQ_growth_%'] = np.where(rng.random(len(right)) < 0.2, np.nan, rng.random(len(right)) * 100)
+    if categorical:
+        # Each frame with its own categories, as apply_schema leaves them
+        for frame in (left, right):
+            for col in group_cols:
+                frame[col] = frame[col].astype('category')
+
+    value_cols = ['registrations_last_quarter', 'QoQ_growth_%']
+    result = join_period_values(left, right, group_cols, 'quarter', value_cols)
+    expected = merged_period_values(left, right, group_cols, 'quarter', value_cols)
+    for col in value_cols:
+        np.testing.assert_array_equal(result[col], expected[col])
+    assert np.isnan(result['registrations_last_quarter'][(left['Maker'].isnull() | (left['Maker'] == 'D')).to_numpy()]).all()
+
+
+def test_join_period_values_with_empty_side():
+    left = pd.DataFrame({'vehicle_type': ['2W'], 'Maker': ['A'], 'year': [2023], 'quarter': [1]})
+    result = join_period_values(left, left.iloc[:0].assign(value=[]), ['vehicle_type', 'Maker'], 'quarter', ['value'])
+    assert np.isnan(result['value']).all()
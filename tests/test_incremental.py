@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+
+from calculation import add_growth_metrics, compute_growth, finalize_results, month_map, summarize
+from incremental import affected_periods, source_mask, splice_periods
+
+YEARS = [2021, 2022, 2023, 2024]
+
+
+def wide_frame(seed=0):
+    """Maker + JAN..DEC rows for two vehicle types over YEARS, zeros included"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for vehicle_type in ['2W', '3W']:
+        for year in YEARS:
+            frame = pd.DataFrame(rng.integers(0, 50, size=(3, 12)), columns=list(month_map))
+            frame.insert(0, 'Maker', ['A', 'B', 'C'])
+            frame['vehicle_type'] = vehicle_type
+            frame['year'] = year
+            frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def sorted_frame(df, sort_cols):
+    return df.sort_values(sort_cols).reset_index(drop=True)
+
+
+def test_source_mask_keeps_one_year_either_side():
+    df = wide_frame()
+    mask = source_mask(df, [('2W', 2022)])
+    assert set(zip(df.loc[mask, 'vehicle_type'], df.loc[mask, 'year'])) == {('2W', 2021), ('2W', 2022), ('2W', 2023)}
+
+
+def test_splice_matches_full_recompute():
+    old = wide_frame()
+    new = old.copy()
+    changed = (new['vehicle_type'] == '2W') & (new['year'] == 2022)
+    # Changed counts, one month going to zero and one coming back from zero
+    new.loc[changed, 'MAR'] = new.loc[changed, 'MAR'] * 3 + 1
+    new.loc[changed & (new['Maker'] == 'A'), 'DEC'] = 0
+    new.loc[changed & (new['Maker'] == 'B'), 'JAN'] = 0
+    partitions = [('2W', 2022)]
+
+    # As calculation.py runs with INCREMENTAL: recompute from the source rows, splice onto the previous output
+    previous_monthly, previous_quarterly = compute_growth(old)
+    final_results, quarterly_with_qoq = add_growth_metrics(*summarize(new[source_mask(new, partitions)]))
+    final_results = finalize_results(splice_periods(final_results, previous_monthly,
+                                                    affected_periods(partitions, 'month'), 'month'))
+    quarterly_with_qoq = splice_periods(quarterly_with_qoq, previous_quarterly,
+                                        affected_periods(partitions, 'quarter'), 'quarter')
+
+    full_monthly, full_quarterly = compute_growth(new)
+    monthly_cols = ['vehicle_type', 'Maker', 'year', 'month']
+    quarterly_cols = ['vehicle_type', 'Maker', 'year', 'quarter']
+    pd.testing.assert_frame_equal(sorted_frame(final_results, monthly_cols)[full_monthly.columns],
+                                  sorted_frame(full_monthly, monthly_cols), check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(sorted_frame(quarterly_with_qoq, quarterly_cols)[full_quarterly.columns],
+                                  sorted_frame(full_quarterly, quarterly_cols), check_dtype=False, check_categorical=False)
+    # The edit reached beyond its own year: 2023 YoY and Q1 2023 QoQ moved with it
+    assert not np.array_equal(previous_monthly.loc[previous_monthly['year'] == 2023, 'YoY_growth_%'].to_numpy(),
+                              full_monthly.loc[full_monthly['year'] == 2023, 'YoY_growth_%'].to_numpy())
@@ -0,0 +1,42 @@
+import json
+
+import profiling
+
+
+def test_laps_do_not_stay_open_and_keep_their_peak():
+    profiler = profiling.start('test', 'trace')
+    try:
+        lap = profiler.laps('laps')
+        block = bytearray(8 * 1024 ** 2)
+        del block
+        lap('allocate')
+        with profiler.stage('nested'):
+            block = bytearray(4 * 1024 ** 2)
+            del block
+        lap('around a stage')
+        lap('idle')
+        assert profiler._open == []
+    finally:
+        records = {record['stage']: record for record in profiler.finish(report=False)}
+    assert records['laps: allocate']['peak_mb'] >= 8
+    # A stage that ran inside the lap counts towards its peak
+    assert records['laps: around a stage']['peak_mb'] >= 4
+    assert records['laps: idle']['peak_mb'] < 1
+
+
+def test_parents_come_before_children_that_start_with_them(tmp_path, capsys, monkeypatch):
+    profiler = profiling.start('test', 'trace')
+    # A frozen clock: the child opens in the same rounded instant as its parent
+    monkeypatch.setattr(profiling.time, 'perf_counter', lambda: profiler.began)
+    try:
+        with profiler.stage('clean'):
+            with profiler.stage('clean: STRIP SPACES'):
+                pass
+    finally:
+        profiler.finish(str(tmp_path))
+    # The child's record is added first
+    assert [record['stage'] for record in profiler.records] == ['clean: STRIP SPACES', 'clean']
+    report = capsys.readouterr().out
+    assert report.index('clean ') < report.index('clean: STRIP SPACES')
+    with open(profiling.trace_path(str(tmp_path), 'test'), encoding='utf-8') as f:
+        assert [stage['stage'] for stage in json.load(f)['stages']] == ['clean', 'clean: STRIP SPACES']
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from rolling import add_rolling_metrics, rolling_cols
+
+
+def reference_rolling(df, windows, cagr_years):
+    """Per-group pandas rolling sums over the group's months from its first row, gaps filled with 0"""
+    out = df.copy()
+    for col in rolling_cols(windows, cagr_years):
+        out[col] = np.nan
+    for _, group in df.dropna(subset=['vehicle_type', 'Maker']).groupby(['vehicle_type', 'Maker']):
+        periods = (group['year'] * 12 + group['month'] - 1).to_numpy()
+        series = (pd.Series(group['registrations'].to_numpy(dtype='float64'), index=periods)
+                  .reindex(range(periods.min(), periods.max() + 1), fill_value=0.0))
+        rolled = {window: series.rolling(window, min_periods=window).sum() for window in set(windows) | {12}}
+        for window in windows:
+            out.loc[group.index, f'registrations_rolling_{window}m'] = rolled[window][periods].to_numpy()
+            out.loc[group.index, f'registrations_avg_{window}m'] = (rolled[window][periods] / window).round(2).to_numpy()
+        for years in cagr_years:
+            earlier = rolled[12].shift(12 * years)
+            cagr = (((rolled[12] / earlier) ** (1 / years) - 1) * 100).round(2).where(earlier > 0)
+            out.loc[group.index, f'CAGR_{years}Y_%'] = cagr[periods].to_numpy()
+    return out
+
+
+def monthly_frame(seed=5):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for year in range(2020, 2025):
+        for month in range(1, 13):
+            # 2W/A: four years with months missing inside the series (gaps count as 0)
+            if (year, month) not in {(2021, 3), (2021, 4), (2022, 11), (2023, 6)}:
+                rows.append(('2W', 'A', year, month, int(rng.integers(100, 5000))))
+            # 2W/B starts in May 2021 and registers nothing for its first year: CAGR against a zero total
+            if (year, month) >= (2021, 5):
+                rows.append(('2W', 'B', year, month, 0 if (year, month) < (2022, 5) else int(rng.integers(0, 300))))
+    # 3W/A: the same maker name in another group, too short for a 12-month window
+    rows += [('3W', 'A', 2024, month, int(rng.integers(0, 50))) for month in range(3, 10)]
+    # Rows without a Maker belong to no series
+    rows.append(('3W', None, 2024, 1, 10))
+    df = pd.DataFrame(rows, columns=['vehicle_type', 'Maker', 'year', 'month', 'registrations'])
+    # Row order must not matter
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def test_rolling_matches_per_group_pandas_reference():
+    df = monthly_frame()
+    windows, cagr_years = (3, 6, 12), (2, 3)
+    result = add_rolling_metrics(df, windows, cagr_years)
+    expected = reference_rolling(df, windows, cagr_years)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_rolling_edge_cases():
+    result = add_rolling_metrics(monthly_frame())
+    assert result.loc[result['Maker'].isnull(), rolling_cols()].isnull().all(axis=None)
+    result = result.dropna(subset=['Maker']).set_index(['vehicle_type', 'Maker', 'year', 'month']).sort_index()
+    # The first window - 1 months of a series have no trailing sum
+    b = result.loc[('2W', 'B')]
+    assert b.loc[[(2021, 5), (2021, 6)], 'registrations_rolling_3m'].isnull().all()
+    assert b.loc[(2021, 7), 'registrations_rolling_3m'] == 0
+    assert b.loc[:(2022, 3), 'registrations_rolling_12m'].isnull().all()
+    # A gap counts as 0: Mar-Apr 2021 are missing, so the 3-month sum at May 2021 is May alone
+    a = result.loc[('2W', 'A')]
+    assert a.loc[(2021, 5), 'registrations_rolling_3m'] == a.loc[(2021, 5), 'registrations']
+    # The earlier 12-month total of 2W/B is 0 in Apr 2022, so there is no CAGR two years on
+    assert b.loc[(2022, 4), 'registrations_rolling_12m'] == 0
+    assert np.isnan(b.loc[(2024, 4), 'CAGR_2Y_%'])
+    assert b.loc[(2024, 5):, 'CAGR_2Y_%'].notnull().all()
+    assert a.loc[(2023, 12):, ['CAGR_2Y_%', 'CAGR_3Y_%']].notnull().all(axis=None)
+    assert result.loc[('3W', 'A'), 'registrations_rolling_12m'].isnull().all()
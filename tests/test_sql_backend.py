@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import build_monthly_index, build_quarterly_index
+from schema import apply_schema
+from sql_backend import MONTHLY_TABLE, QUARTERLY_TABLE, SqlIndex, build_database, open_database
+
+
+def metrics_frames(seed=4):
+    """Small monthly and quarterly metrics frames with missing growth values and an unselectable row"""
+    rng = np.random.default_rng(seed)
+    keys = [(vt, maker) for vt in ['2W', '3W'] for maker in ['ATHER', 'BAJAJ', 'HERO', 'TVS']]
+    monthly = pd.DataFrame([(vt, maker, year, month) for vt, maker in keys for year in [2023, 2024]
+                            for month in range(1, 13) if rng.random() > 0.15],
+                           columns=['vehicle_type', 'Maker', 'year', 'month'])
+    n = len(monthly)
+    monthly['date'] = pd.to_datetime(dict(year=monthly['year'], month=monthly['month'], day=1))
+    monthly['registrations'] = rng.integers(0, 5000, n)
+    monthly['YoY_growth_%'] = np.where(monthly['year'] == 2023, np.nan, rng.random(n) * 100).round(2)
+    monthly['registrations_rolling_12m'] = np.where(rng.random(n) < 0.4, np.nan, rng.integers(0, 60000, n))
+    monthly['CAGR_2Y_%'] = np.where(rng.random(n) < 0.7, np.nan, rng.random(n) * 50 - 10)
+    monthly.loc[3, 'Maker'] = None
+
+    quarterly = (monthly.assign(quarter=(monthly['month'] - 1) // 3 + 1)
+                 .groupby(['vehicle_type', 'Maker', 'year', 'quarter'], as_index=False)['registrations'].sum())
+    quarterly['QoQ_growth_%'] = np.where(rng.random(len(quarterly)) < 0.2, np.nan, rng.random(len(quarterly)) * 80)
+    return apply_schema(monthly), apply_schema(quarterly)
+
+
+@pytest.fixture(scope='module')
+def indexes(tmp_path_factory):
+    df_month, df_quarter = metrics_frames()
+    path = str(tmp_path_factory.mktemp('store') / 'vehicle_growth_metrics.sqlite')
+    build_database(path, df_month, df_quarter, [['metrics', 1, 2]])
+    return {'monthly': (build_monthly_index(df_month), SqlIndex(path, MONTHLY_TABLE)),
+            'quarterly': (build_quarterly_index(df_quarter), SqlIndex(path, QUARTERLY_TABLE))}
+
+
+def selections(index):
+    """(vehicle types, makers, range start, range end) to query, including an empty one"""
+    ranges = index.period_ranges
+    return [
+        (index.vehicle_types, index.makers, ranges[0], ranges[-1]),
+        (['3W'], ['BAJAJ', 'TVS'], ranges[5], ranges[-4]),
+        (['2W', '3W'], ['HERO'], ranges[len(ranges) // 2], ranges[len(ranges) // 2]),
+        (['2W'], [], ranges[0], ranges[-1]),
+    ]
+
+
+@pytest.mark.parametrize('table', ['monthly', 'quarterly'])
+def test_sql_index_matches_filter_index(indexes, table):
+    memory, sql = indexes[table]
+    np.testing.assert_array_equal(sql.vehicle_types, memory.vehicle_types)
+    np.testing.assert_array_equal(sql.makers, memory.makers)
+    np.testing.assert_array_equal(sql.period_ranges, memory.period_ranges)
+    for vehicle_types, makers, start, end in selections(memory):
+        vt_mask, maker_mask = memory.masks(vehicle_types, makers)
+        first, last = memory.period_range(start, end)
+        assert sql.period_range(start, end) == (first, last)
+        args = (vt_mask, maker_mask, first, last)
+
+        expected = memory.filtered_rows(*args).reset_index(drop=True)
+        pd.testing.assert_frame_equal(sql.filtered_rows(*args)[list(expected.columns)], expected,
+                                      check_dtype=False, check_categorical=False)
+
+        memory_totals, sql_totals = memory.totals(*args), sql.totals(*args)
+        assert sql_totals.keys() == memory_totals.keys()
+        for col, value in memory_totals.items():
+            np.testing.assert_allclose(sql_totals[col], value)
+
+        value_cols = ['registrations'] + memory.sum_cols
+        for value_col in value_cols:
+            pd.testing.assert_frame_equal(sql.trend(*args, value_col=value_col), memory.trend(*args, value_col=value_col),
+                                          check_dtype=False)
+
+        pd.testing.assert_frame_equal(sql.by_maker(*args), memory.by_maker(*args), check_dtype=False)
+
+
+def test_read_only_store_is_not_rebuilt(tmp_path):
+    path = str(tmp_path / 'vehicle_growth_metrics.sqlite')
+    # A snapshot published without a store: nothing is written, the caller falls back to memory
+    assert open_database(path, [['metrics', 1, 2]]) is None
+    assert not (tmp_path / 'vehicle_growth_metrics.sqlite').exists()
+
+    df_month, df_quarter = metrics_frames()
+    build_database(path, df_month, df_quarter, [['metrics', 1, 2]])
+    assert open_database(path, [['metrics', 1, 3]]) is None
+    month_index, quarter_index = open_database(path, [['metrics', 1, 2]])
+    assert quarter_index.table == QUARTERLY_TABLE
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from calculation import align_report_blocks, iter_wide_months, month_map, summarize, wide_months
+from streaming import stream_aggregates
+
+MONTHS = list(month_map)
+COLUMNS = ['manufacturer'] + [f'Unnamed: {i}' for i in range(1, 15)]
+
+
+def report_block(vehicle_type, year, n_months, makers, rng):
+    """One raw report sheet as clean() passes it through: header rows, then maker rows"""
+    total_col = 2 + n_months
+    title = ['S No', 'Maker', 'Month Wise'] + [None] * 12
+    title[total_col] = 'TOTAL'
+    header = [None, None] + MONTHS[:n_months] + [None] * (13 - n_months)
+    rows = [title, [None] * 15, header]
+    for i, maker in enumerate(makers, start=1):
+        counts = rng.integers(0, 3000, n_months)
+        # Counts come as text with digit grouping; TOTAL follows the last reported month
+        cells = [f'{count:,}' for count in counts] + [f'{counts.sum():,}'] + [None] * (12 - n_months)
+        rows.append([str(i), maker] + cells)
+    frame = pd.DataFrame(rows, columns=COLUMNS, dtype=object)
+    frame['vehicle_type'] = vehicle_type
+    frame['year'] = year
+    return frame
+
+
+def report_frame(seed=3):
+    rng = np.random.default_rng(seed)
+    return pd.concat([
+        report_block('2W', 2023, 12, ['A', 'B', 'C', 'D'], rng),
+        report_block('2W', 2024, 12, ['A', 'B', 'E'], rng),
+        # Fewer months reported: TOTAL sits right after AUG
+        report_block('2W', 2025, 8, ['A', 'C', 'E'], rng),
+        report_block('3W', 2024, 12, ['A', 'F'], rng),
+    ], ignore_index=True)
+
+
+def chunks_of(df, n):
+    return [df.iloc[start:start + n] for start in range(0, len(df), n)]
+
+
+def sorted_frame(df, sort_cols):
+    return df.sort_values(sort_cols).reset_index(drop=True)
+
+
+def test_report_blocks_keep_total_out_of_the_months():
+    df_wide = wide_months(report_frame())
+    assert len(df_wide) == 12
+    row = df_wide[(df_wide['Maker'] == 'A') & (df_wide['year'] == 2025)].iloc[0]
+    assert not np.isnan(row['AUG']) and np.isnan(row['SEP'])
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, 3, 5, 7, 11, 1000])
+def test_streaming_split_blocks_match_whole_frame(chunk_rows):
+    df = report_frame()
+    monthly, quarterly = summarize(wide_months(df))
+    streamed_monthly, streamed_quarterly = stream_aggregates(iter_wide_months(chunks_of(df, chunk_rows)), month_map)
+
+    monthly_cols = ['vehicle_type', 'Maker', 'year', 'month']
+    quarterly_cols = ['vehicle_type', 'Maker', 'year', 'quarter']
+    pd.testing.assert_frame_equal(sorted_frame(streamed_monthly, monthly_cols),
+                                  sorted_frame(monthly, monthly_cols)[streamed_monthly.columns],
+                                  check_dtype=False, check_categorical=False)
+    pd.testing.assert_frame_equal(sorted_frame(streamed_quarterly, quarterly_cols),
+                                  sorted_frame(quarterly, quarterly_cols)[streamed_quarterly.columns],
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_counts_before_a_header_raise():
+    df = report_frame()
+    # Starts inside the first block, without the layout the earlier rows set up
+    with pytest.raises(ValueError, match='before a Maker/JAN..DEC header row'):
+        align_report_blocks(df.iloc[5:])
+    with pytest.raises(ValueError, match='no Maker/JAN..DEC'):
+        list(iter_wide_months(chunks_of(df.iloc[:2], 1)))